@@ -1,5 +1,72 @@
+"""
+Admin for the app's models, built to stay fast on large tables.
+
+The changelists never run a full ``COUNT(*)``. ``show_full_result_count`` is
+off, and ``EstimatedCountPaginator`` counts pages as follows. An unfiltered
+list of a large table uses the planner's row estimate (``pg_class.reltuples``,
+refreshed by autovacuum and ANALYZE). A filtered list counts at most
+``FILTERED_COUNT_LIMIT`` matches, so matches past that are not paged to.
+Search is limited to prefix matches on indexed columns, and foreign keys
+use raw-id inputs instead of a dropdown of every user.
+"""
 from django.contrib import admin
-from .models import Item, UserDetails
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .models import Item, TransactionDetails, UserDetails
+
+ESTIMATE_THRESHOLD = 100_000  # below this many rows, an exact count is cheap
+FILTERED_COUNT_LIMIT = 10_000
+
+
+def estimated_rows(model, using='default'):
+    """
+    The planner's estimate of the rows in ``model``'s table, summed over its
+    partitions, or None on databases other than PostgreSQL.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        # Autovacuum analyzes partitions, never their parent, so use the
+        # partitions' estimates when there are any. -1 means never analyzed.
+        cursor.execute(
+            """
+            SELECT COALESCE(
+                (SELECT SUM(GREATEST(child.reltuples, 0)) FROM pg_inherits
+                 JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                 WHERE pg_inherits.inhparent = to_regclass(%s)),
+                (SELECT GREATEST(reltuples, 0) FROM pg_class WHERE oid = to_regclass(%s))
+            )
+            """,
+            [table, table],
+        )
+        return int(cursor.fetchone()[0] or 0)
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+            return queryset.count()
+        return queryset.order_by().values('pk')[:FILTERED_COUNT_LIMIT].count()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER  # facet counts scan every row
+
+    def get_search_results(self, request, queryset, search_term):
+        # Searched columns hold upper-case ids and digits.
+        return super().get_search_results(request, queryset, search_term.strip().upper())
+
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
@@ -7,7 +74,28 @@ class ItemAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
 
 @admin.register(UserDetails)
-class UserDetailsAdmin(admin.ModelAdmin):
-    list_display = ('user_id', 'name', 'phone_number', 'age', 'bank_account_name')
-    search_fields = ('user_id', 'name', 'phone_number')
+class UserDetailsAdmin(ScalableAdmin):
+    list_display = ('user_id', 'name', 'phone_number', 'age', 'bank_account_name', 'balance')
+    list_select_related = ('profile',)
+    # The primary key's _like index and userdetails_phone_idx serve these.
+    search_fields = ('user_id__startswith', 'phone_number__startswith')
+    search_help_text = 'User ID or phone number prefix'
     readonly_fields = ('user_id',)
+
+    @admin.display(description='Balance')
+    def balance(self, obj):
+        profile = getattr(obj, 'profile', None)
+        return profile.total_balance if profile else None
+
+@admin.register(TransactionDetails)
+class TransactionDetailsAdmin(ScalableAdmin):
+    list_display = ('id', 'user', 'amount', 'transaction_type', 'category', 'date')
+    list_select_related = ('user',)
+    list_filter = ('transaction_type',)
+    date_hierarchy = 'date'  # drill-down rendered by the transaction_admin tag library
+    ordering = ('-date', '-id')  # txn_date_id_idx
+    # Matches the leading column of the txn_user_* indexes.
+    search_fields = ('user__user_id__exact',)
+    search_help_text = 'Exact user ID'
+    raw_id_fields = ('user',)
+    readonly_fields = ('recurring_source', 'next_run', 'updated_at')
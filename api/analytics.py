@@ -0,0 +1,160 @@
+"""
+Chart data for the mobile app: category breakdown, monthly trend and
+spending percentiles.
+
+``compute`` pulls the four columns it needs in one query and does all the
+grouping with NumPy array operations. ``compute_naive`` is the equivalent
+loop over model instances; it is kept as the reference implementation for
+tests and ``manage.py bench_analytics``.
+"""
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+from django.db.models import Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import dates
+from .models import TransactionDetails
+
+PERCENTILES = (50, 75, 90, 95, 99)
+ROLLING_WINDOW = 3  # months
+UNCATEGORIZED = 'Uncategorized'
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _month_label(index):
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def _round(values):
+    return [round(float(v), 2) for v in values]
+
+
+def _transactions(user, date_from, date_to):
+    return TransactionDetails.objects.filter(user=user, **dates.range_filters(date_from, date_to)).order_by()
+
+
+def _rolling_mean(values, window):
+    """Trailing mean over ``window`` points; shorter at the start of the series."""
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    return (cumsum[end] - cumsum[start]) / (end - start)
+
+
+def _change(values):
+    """Period-over-period change in percent; None where the previous period is 0."""
+    change = [None]
+    for previous, current in zip(values[:-1], values[1:]):
+        change.append(round((current - previous) / previous * 100, 2) if previous else None)
+    return change
+
+
+def _result(categories, totals, months, income, expense, percentiles):
+    grand_total = sum(totals)
+    rolling = _rolling_mean(np.asarray(expense, dtype=np.float64), ROLLING_WINDOW)
+    expense = _round(expense)
+    return {
+        'categories': [
+            {'category': category, 'total': round(total, 2),
+             'share': round(total / grand_total, 4) if grand_total else 0.0}
+            for category, total in zip(categories, totals)
+        ],
+        'monthly': [
+            {'month': _month_label(month), 'income': inc, 'expense': exp, 'net': round(inc - exp, 2),
+             'expense_change': change, 'expense_rolling_mean': mean}
+            for month, inc, exp, change, mean in zip(
+                months, _round(income), expense, _change(expense), _round(rolling)
+            )
+        ],
+        'percentiles': {f'p{p}': value for p, value in zip(PERCENTILES, percentiles)},
+    }
+
+
+def compute(user, date_from, date_to):
+    """Analytics for ``user`` between two dates (inclusive), vectorized."""
+    rows = list(
+        _transactions(user, date_from, date_to)
+        .annotate(day=TruncDate('date'), bucket=Coalesce('category', Value(UNCATEGORIZED)))
+        .values_list('day', 'amount', 'transaction_type', 'bucket')
+    )
+    first_month, last_month = _month_index(date_from), _month_index(date_to)
+    months = np.arange(first_month, last_month + 1)
+
+    if rows:
+        days, amounts, types, categories = zip(*rows)
+        days = np.array(days, dtype='datetime64[D]')
+        amounts = np.array(amounts, dtype=np.float64)
+        types = np.array(types)
+        categories = np.array(categories)
+    else:
+        days = np.array([], dtype='datetime64[D]')
+        amounts = np.array([], dtype=np.float64)
+        types = np.array([], dtype='<U8')
+        categories = np.array([], dtype='<U1')
+
+    # datetime64[M] counts months since 1970-01.
+    month_bins = days.astype('datetime64[M]').astype(np.int64) + 1970 * 12 - first_month
+    is_income = types == 'INCOME'
+    is_expense = types == 'EXPENSE'
+    income = np.bincount(month_bins[is_income], weights=amounts[is_income], minlength=len(months))
+    expense = np.bincount(month_bins[is_expense], weights=amounts[is_expense], minlength=len(months))
+
+    names, inverse = np.unique(categories[is_expense], return_inverse=True)
+    totals = np.bincount(inverse, weights=amounts[is_expense], minlength=len(names))
+    order = np.lexsort((names, -totals))
+
+    spent = amounts[is_expense]
+    percentiles = _round(np.percentile(spent, PERCENTILES)) if len(spent) else [0.0] * len(PERCENTILES)
+
+    return _result(
+        [str(name) for name in names[order]], _round(totals[order]),
+        months.tolist(), income[:len(months)], expense[:len(months)], percentiles,
+    )
+
+
+def _percentile(sorted_values, p):
+    # Linear interpolation between closest ranks, like numpy's default.
+    position = (len(sorted_values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def compute_naive(user, date_from, date_to):
+    """Same output as ``compute``, built with Python loops over model instances."""
+    first_month, last_month = _month_index(date_from), _month_index(date_to)
+    months = list(range(first_month, last_month + 1))
+    income = [0.0] * len(months)
+    expense = [0.0] * len(months)
+    by_category = defaultdict(float)
+    spent = []
+
+    for txn in _transactions(user, date_from, date_to):
+        amount = float(txn.amount)
+        slot = _month_index(timezone.localtime(txn.date).date()) - first_month
+        if txn.transaction_type == 'INCOME':
+            income[slot] += amount
+        elif txn.transaction_type == 'EXPENSE':
+            expense[slot] += amount
+            by_category[txn.category or UNCATEGORIZED] += amount
+            spent.append(amount)
+
+    ranked = sorted(by_category.items(), key=lambda item: (-item[1], item[0]))
+    spent.sort()
+    percentiles = [round(_percentile(spent, p), 2) for p in PERCENTILES] if spent else [0.0] * len(PERCENTILES)
+    return _result(
+        [name for name, _ in ranked], [round(total, 2) for _, total in ranked],
+        months, income, expense, percentiles,
+    )
+
+
+def default_range(today):
+    """The last twelve calendar months, including the current one."""
+    month = _month_index(today) - 11
+    return date(month // 12, month % 12 + 1, 1), today
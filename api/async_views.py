@@ -0,0 +1,126 @@
+"""
+Async variants of the password-handling endpoints.
+
+Served through ``backend/asgi.py``; a worker keeps answering other requests
+while PBKDF2 runs in ``api.hashing``'s bounded thread pool. When that pool
+is saturated the views answer 503 with ``Retry-After`` instead of queueing
+without bound. DRF 3.14 has no async views, so these are plain Django views
+that keep the same request and response shapes as their DRF counterparts.
+"""
+import json
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import hashing
+from .models import UserDetails
+from .serializers import UserDetailsSerializer
+
+RETRY_AFTER_SECONDS = 1
+
+
+def _request_data(request):
+    """The form or JSON object posted; ValueError for malformed JSON or a non-object body."""
+    if request.content_type == 'application/json':
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('JSON body is not an object')
+        return data
+    return request.POST
+
+
+def _error(message, status, **extra):
+    return JsonResponse({'status': 'error', 'message': message, **extra}, status=status)
+
+
+def _busy():
+    response = _error('Server is busy, please retry shortly', 503)
+    response['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def login_user_async(request):
+    try:
+        data = _request_data(request)
+    except ValueError:
+        return _error('Invalid JSON body', 400)
+    phone_number = data.get('phone_number')
+    password = data.get('password')
+
+    # Validate input
+    if not phone_number or not password:
+        return _error('Phone number and password are required', 400)
+
+    try:
+        user = await UserDetails.objects.aget(phone_number=phone_number)
+    except ObjectDoesNotExist:
+        return _error('User not found with this phone number', 404)
+
+    try:
+        valid, needs_rehash = await hashing.averify_password(password, user.password)
+    except hashing.PoolSaturated:
+        return _busy()
+    if not valid:
+        return _error('Invalid password', 401)
+
+    if needs_rehash:
+        # Upgrade the stored hash to the current hasher settings. If the pool
+        # is busy, skip it; the next successful login will try again.
+        try:
+            encoded = await hashing.amake_password(password)
+        except hashing.PoolSaturated:
+            pass
+        else:
+            await UserDetails.objects.filter(pk=user.pk).aupdate(password=encoded)
+
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Login successful',
+        'data': {
+            'user_id': user.user_id,
+            'token': user.token,
+            'name': user.name,
+            'phone_number': user.phone_number,
+            'age': user.age,
+            'bank_account_name': user.bank_account_name,
+            'profile_img': user.profile_img
+        }
+    }, status=200)
+
+
+@csrf_exempt
+@require_POST
+async def create_user_async(request):
+    try:
+        data = _request_data(request)
+    except ValueError:
+        return _error('Invalid JSON body', 400)
+
+    # Field validation touches no database for this serializer, so it is
+    # safe to run directly on the event loop.
+    serializer = UserDetailsSerializer(data=data)
+    if not serializer.is_valid():
+        return _error('Invalid data provided', 400, errors=serializer.errors)
+
+    validated = dict(serializer.validated_data)
+    try:
+        validated['password'] = await hashing.amake_password(validated['password'])
+    except hashing.PoolSaturated:
+        return _busy()
+    user = await UserDetails.objects.acreate(**validated)
+
+    return JsonResponse({
+        'status': 'success',
+        'message': 'User created successfully',
+        'data': {
+            'user_id': user.user_id,
+            'token': user.token,
+            'name': user.name,
+            'phone_number': user.phone_number,
+            'profile_img': user.profile_img if user.profile_img else None
+        }
+    }, status=201)
@@ -0,0 +1,106 @@
+"""
+Token authentication for ``UserDetails``.
+
+Clients send ``Authorization: Token <token>``. Resolved users are kept in a
+small in-process LRU cache with a TTL so repeat callers skip the database;
+``api.signals`` evicts a user's entry whenever the row is saved or deleted.
+Other worker processes only see such changes once their entry expires, so
+keep ``TOKEN_CACHE_TTL`` short.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import authentication, exceptions
+
+from .models import UserDetails
+
+
+class TokenCache:
+    """Thread-safe LRU mapping of token -> UserDetails with per-entry TTL."""
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (expires_at, user)
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                self._discard(token)
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def set(self, token, user):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._discard(self._tokens_by_user.get(user.user_id))
+            self._entries[token] = (time.monotonic() + self.ttl, user)
+            self._tokens_by_user[user.user_id] = token
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._discard(self._tokens_by_user.get(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _discard(self, token):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            self._tokens_by_user.pop(entry[1].user_id, None)
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 300),
+)
+
+
+class UserDetailsTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticate ``Authorization: Token <token>`` against ``UserDetails.token``.
+
+    On success ``request.user`` is the ``UserDetails`` instance. The instance
+    may be shared with other requests through the cache, so views must treat
+    it as read-only.
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header')
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header')
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        user = token_cache.get(token)
+        if user is None:
+            try:
+                user = UserDetails.objects.get(token=token)
+            except UserDetails.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token or user not found')
+            token_cache.set(token, user)
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
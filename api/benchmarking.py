@@ -0,0 +1,125 @@
+"""
+Helpers shared by the ``bench_*`` management commands: seeding synthetic
+users and transactions, and running a benchmark inside a transaction that
+is always rolled back so the database is left untouched.
+"""
+import random
+import secrets
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import chain, islice
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Profile, Statistics, TransactionDetails, UserDetails
+
+CATEGORIES = ('Food', 'Transport', 'Rent', 'Shopping', 'Health', 'Fun', None)
+DESCRIPTIONS = ('Coffee', 'Groceries', 'Uber ride', 'Monthly rent', 'Pharmacy', 'Cinema', None)
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is rolled back on exit."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def seed_user(index=0):
+    # A pre-hashed placeholder password keeps PBKDF2 out of the seeding time.
+    return UserDetails.objects.create(
+        name=f'Bench User {index}', phone_number=f'+1{index:010d}', age=30,
+        bank_account_name='Bench', password='pbkdf2_sha256$bench'
+    )
+
+
+def seed_users(count, batch_size=2000):
+    """
+    Bulk-insert ``count`` users without going through ``save()`` or signals;
+    call ``rebuild_rollups`` afterwards to give them profiles.
+    """
+    users = [
+        UserDetails(
+            # An odd multiplier permutes the 32-bit space: distinct, spread-out ids.
+            user_id=f'{index * 2654435761 % 16 ** 8:08X}', token=secrets.token_hex(32),
+            name=f'Bench User {index}', phone_number=f'+1{index:010d}', age=30,
+            bank_account_name='Bench', password='pbkdf2_sha256$bench'
+        )
+        for index in range(count)
+    ]
+    return UserDetails.objects.bulk_create(users, batch_size=batch_size)
+
+
+def make_transactions(user, count, rng=None, days=365):
+    """Unsaved TransactionDetails spread over the last ``days`` days."""
+    rng = rng or random.Random(0)
+    now = timezone.now()
+    for _ in range(count):
+        yield TransactionDetails(
+            user=user,
+            amount=Decimal(rng.randint(100, 500000)) / 100,
+            transaction_type='INCOME' if rng.random() < 0.1 else 'EXPENSE',
+            category=rng.choice(CATEGORIES),
+            description=rng.choice(DESCRIPTIONS),
+            date=now - timedelta(minutes=rng.randint(0, days * 24 * 60)),
+        )
+
+
+def seed_transactions(user, count, rng=None, batch_size=5000):
+    TransactionDetails.objects.bulk_create(make_transactions(user, count, rng), batch_size=batch_size)
+
+
+def seed_population(users, per_user, rng=None, batch_size=5000):
+    """``users`` seeded users with ``per_user`` transactions each, rollups included."""
+    rng = rng or random.Random(0)
+    seeded = seed_users(users)
+    # bulk_create materializes its input, so feed it a chunk at a time.
+    transactions = chain.from_iterable(make_transactions(user, per_user, rng) for user in seeded)
+    while chunk := list(islice(transactions, batch_size)):
+        TransactionDetails.objects.bulk_create(chunk)
+    rebuild_rollups([user.user_id for user in seeded])
+    return seeded
+
+
+def rebuild_rollups(user_ids, batch_size=2000):
+    """
+    Statistics rows and Profile balances for freshly bulk-inserted users, from
+    one grouped query instead of the per-write path in ``api.rollups``.
+    """
+    rows = (
+        TransactionDetails.objects
+        .filter(user_id__in=user_ids)
+        .annotate(day=TruncDate('date'))
+        .values('user_id', 'day')
+        .annotate(
+            income=Sum('amount', filter=Q(transaction_type='INCOME'), default=0),
+            expense=Sum('amount', filter=Q(transaction_type='EXPENSE'), default=0),
+        )
+        .order_by()
+    )
+    balances = defaultdict(Decimal)
+
+    def statistics():
+        for row in rows.iterator(chunk_size=batch_size):
+            balances[row['user_id']] += row['income'] - row['expense']
+            if row['income'] or row['expense']:
+                yield Statistics(user_id=row['user_id'], date=row['day'],
+                                 total_income=row['income'], total_expense=row['expense'])
+
+    Statistics.objects.bulk_create(statistics(), batch_size=batch_size)
+    Profile.objects.bulk_create(
+        (Profile(user_id=user_id, total_balance=balances[user_id]) for user_id in user_ids),
+        batch_size=batch_size,
+    )
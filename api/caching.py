@@ -0,0 +1,140 @@
+"""
+Keys and invalidation for data cached through Django's cache framework.
+
+Cached user-list pages are namespaced by a generation counter. Any write to
+UserDetails bumps the counter (see ``api.signals``), so every stale page
+becomes unreachable at once without having to enumerate keys.
+
+Each user also has a transactions version, ``Profile.transactions_version``,
+that every TransactionDetails write increments in its own DB transaction.
+The transaction read views derive their ETag from it, so a matching
+``If-None-Match`` costs one primary-key lookup of the profile and never
+touches the transaction table. It lives in the database rather than the
+cache so that every worker process sees a write as soon as it commits.
+The bump also locks the profile row until commit, so one user's versions
+commit in order. Rows and tombstones are stamped with the version they were
+written under (``change_seq``), which makes the version a commit-ordered
+change sequence for delta sync.
+
+Both kinds of write also make the data they touch sticky to the primary
+database for a few seconds (``api.db_router``), so a replica that lags
+behind never serves it under the new generation or version.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import db_router
+from .models import Profile
+
+USERS_GENERATION_KEY = 'users:generation'
+USERS_COUNT_KEY = 'users:count'
+USERS_PAGE_TIMEOUT = 300  # seconds
+USERS_COUNT_TIMEOUT = 300
+USERS_SCOPE = 'users'
+TRANSACTIONS_COUNT_TIMEOUT = 300
+
+
+def users_generation():
+    generation = cache.get(USERS_GENERATION_KEY)
+    if generation is None:
+        cache.add(USERS_GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(USERS_GENERATION_KEY, 1)
+    return generation
+
+
+def users_page_key(page_size, cursor):
+    return f'users:page:{users_generation()}:{page_size}:{cursor or ""}'
+
+
+def invalidate_users(count_changed=False):
+    # Deferred to commit: a page read before then would be cached under the
+    # new generation without the write, and stay stale until the next one.
+    def invalidate():
+        try:
+            cache.incr(USERS_GENERATION_KEY)
+        except ValueError:
+            cache.add(USERS_GENERATION_KEY, 1, timeout=None)
+        if count_changed:
+            cache.delete(USERS_COUNT_KEY)
+        db_router.mark_written(USERS_SCOPE)
+
+    transaction.on_commit(invalidate)
+
+
+def users_count(queryset):
+    count = cache.get(USERS_COUNT_KEY)
+    if count is None:
+        count = queryset.count()
+        cache.set(USERS_COUNT_KEY, count, timeout=USERS_COUNT_TIMEOUT)
+    return count
+
+
+def transactions_scope(user_id):
+    return f'transactions:{user_id}'
+
+
+def committed_version(user_id):
+    """``user_id``'s latest committed transactions version, or None without a profile."""
+    return Profile.objects.filter(user_id=user_id).values_list('transactions_version', flat=True).first()
+
+
+def transactions_version(user_id):
+    version = committed_version(user_id)
+    if version is None:
+        # No profile to version against: an ETag that never matches only
+        # costs clients a full response.
+        return uuid.uuid4().hex
+    return str(version)
+
+
+def bump_transactions_version(user_id):
+    """
+    Give ``user_id`` a new transactions version and return it, for stamping
+    the rows the write touches as ``change_seq``. Call it inside the write's
+    DB transaction, before those rows are written. Readers keep seeing the
+    old version, along with the old rows, until it commits, and the profile
+    row stays locked until then, so the next version is handed out only
+    after this one is visible.
+    """
+    column = connection.ops.quote_name(Profile._meta.get_field('transactions_version').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {connection.ops.quote_name(Profile._meta.db_table)} SET {column} = {column} + 1 '
+            f'WHERE {connection.ops.quote_name("user_id")} = %s RETURNING {column}',
+            [user_id],
+        )
+        row = cursor.fetchone()
+    transaction.on_commit(lambda: db_router.mark_written(transactions_scope(user_id)))
+    return row[0] if row else 0
+
+
+def bump_transactions_versions(user_ids):
+    """``{user_id: new version}``, locking profiles in a fixed order so concurrent writers cannot deadlock."""
+    return {user_id: bump_transactions_version(user_id) for user_id in sorted(user_ids)}
+
+
+def transactions_etag(user_id, *parts, version=None):
+    """
+    Strong ETag for a view of ``user_id``'s transactions described by
+    ``parts``. Pass ``version`` if it has already been read.
+    """
+    if version is None:
+        version = transactions_version(user_id)
+    raw = '|'.join([version, *map(str, parts)])
+    return '"%s"' % hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def transactions_count(user_id, version, queryset, *parts):
+    """
+    ``queryset.count()`` for the view of ``user_id``'s transactions described
+    by ``parts``, cached until the transactions version moves on.
+    """
+    key = 'transactions:count:%s' % transactions_etag(user_id, *parts, version=version).strip('"')
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout=TRANSACTIONS_COUNT_TIMEOUT)
+    return count
@@ -0,0 +1,21 @@
+"""
+Date-range filters on transaction timestamps.
+
+The API takes inclusive local dates (``from``/``to``); queries use a
+half-open timestamp range so the (user, date) indexes serve them and date
+partitions are pruned.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def range_filters(date_from=None, date_to=None, field='date'):
+    """ORM lookups for ``field`` between two optional dates, both inclusive."""
+    filters = {}
+    if date_from:
+        filters[f'{field}__gte'] = timezone.make_aware(datetime.combine(date_from, time.min))
+    # Nothing comes after date.max, and the day after it can't be represented.
+    if date_to and date_to != date.max:
+        filters[f'{field}__lt'] = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return filters
@@ -0,0 +1,86 @@
+"""
+Read-replica routing.
+
+Writes, and reads by default, go to ``default``. Views decorated with
+``read_from_replica`` send their reads to one of ``settings.DATABASE_REPLICAS``
+instead, unless the data they show was written within the last
+``REPLICA_STICKY_SECONDS``. Stickiness is recorded in the cache when the
+write commits (see ``api.caching``) and is keyed by what was written, e.g.
+one user's transactions. That way every device of the writing user reads
+its own writes, while replica lag never lets a fresh ETag or a cached page
+be built from stale rows.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_DB = 'default'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def _sticky_key(scope):
+    return f'replica:sticky:{scope}'
+
+
+def mark_written(scope):
+    """Keep reads of ``scope`` on the primary while replicas catch up."""
+    if replicas():
+        cache.set(_sticky_key(scope), 1, timeout=getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+
+
+def recently_written(scope):
+    return cache.get(_sticky_key(scope)) is not None
+
+
+def replica_for(scope):
+    """A replica alias to read ``scope`` from, or None to stay on the primary."""
+    aliases = replicas()
+    if not aliases or recently_written(scope):
+        return None
+    return random.choice(aliases)
+
+
+def read_from_replica(scope):
+    """
+    Route the decorated view's reads to a replica. ``scope(request)`` names
+    the data it shows, matching a ``mark_written`` call on the write path.
+    Put it directly above the view function, below DRF's decorators, so
+    ``request.user`` is already authenticated.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            alias = replica_for(scope(request))
+            if alias is None:
+                return view(request, *args, **kwargs)
+            token = _read_alias.set(alias)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return wrapped
+    return decorator
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or Django would write instances back to the replica
+        # they were read from.
+        return DEFAULT_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
@@ -0,0 +1,16 @@
+from rest_framework.views import exception_handler
+
+
+def api_exception_handler(exc, context):
+    """
+    DRF's default handler, but errors that only carry a ``detail`` message
+    (authentication, permission, throttling, ...) are rendered in the same
+    ``{'status': 'error', 'message': ...}`` envelope the views use.
+    """
+    response = exception_handler(exc, context)
+    if response is not None and isinstance(response.data, dict) and set(response.data) == {'detail'}:
+        response.data = {
+            'status': 'error',
+            'message': str(response.data['detail'])
+        }
+    return response
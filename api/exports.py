@@ -0,0 +1,63 @@
+"""
+Row generators for streaming a user's transactions out as CSV or NDJSON.
+
+Rows are read through a server-side cursor as plain tuples and encoded a
+chunk at a time, so memory stays flat no matter how long the history is.
+"""
+import csv
+import io
+import json
+
+EXPORT_FIELDS = (
+    'id', 'date', 'amount', 'transaction_type', 'category', 'description',
+    'is_recurring', 'recurring_frequency',
+)
+
+CHUNK_SIZE = 2000
+
+
+def _chunks(queryset, chunk_size=CHUNK_SIZE):
+    chunk = []
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _encode(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_csv(queryset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in _chunks(queryset):
+        writer.writerows([_encode(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(queryset):
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for chunk in _chunks(queryset):
+        yield ''.join(
+            encoder.encode(dict(zip(EXPORT_FIELDS, map(_encode, row)))) + '\n'
+            for row in chunk
+        )
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+}
@@ -0,0 +1,58 @@
+"""
+Password hashing off the event loop.
+
+PBKDF2 takes hundreds of milliseconds per call, so the async views run it in
+a bounded thread pool (hashlib releases the GIL while it works, so threads
+hash in parallel). At most ``PASSWORD_HASH_POOL_SIZE`` hashes run at once
+and at most ``PASSWORD_HASH_QUEUE_SIZE`` more may wait for a thread; beyond
+that ``PoolSaturated`` is raised immediately so callers can shed load
+instead of piling up requests.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+POOL_SIZE = getattr(settings, 'PASSWORD_HASH_POOL_SIZE', None) or os.cpu_count() or 1
+QUEUE_SIZE = getattr(settings, 'PASSWORD_HASH_QUEUE_SIZE', None) or POOL_SIZE * 4
+
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='password-hash')
+_lock = threading.Lock()
+_in_flight = 0
+
+
+class PoolSaturated(Exception):
+    """Every hashing thread is busy and the wait queue is full."""
+
+
+async def run_in_pool(func, *args):
+    global _in_flight
+    with _lock:
+        if _in_flight >= POOL_SIZE + QUEUE_SIZE:
+            raise PoolSaturated
+        _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        with _lock:
+            _in_flight -= 1
+
+
+def _verify(raw_password, encoded):
+    # Django calls the setter only for a correct password whose hash is
+    # outdated (e.g. PBKDF2 iterations were raised since it was stored).
+    outdated = []
+    valid = check_password(raw_password, encoded, setter=outdated.append)
+    return valid, bool(outdated)
+
+
+async def averify_password(raw_password, encoded):
+    """Return ``(valid, needs_rehash)`` without blocking the event loop."""
+    return await run_in_pool(_verify, raw_password, encoded)
+
+
+async def amake_password(raw_password):
+    return await run_in_pool(make_password, raw_password)
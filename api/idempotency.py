@@ -0,0 +1,86 @@
+"""
+``Idempotency-Key`` support for create_transaction.
+
+A client that may retry a request sends the same unique key with each try.
+The first request claims the key inside the DB transaction that inserts
+the transaction, and stores its response in the same transaction. A retry
+finds the key with one indexed lookup and gets that response back, with
+``Idempotent-Replayed: true``; it is not validated or inserted again.
+
+Two copies of a request can arrive at the same time and both miss the
+lookup. The second one's claim then waits on the unique index until the
+first commits, fails, and rolls back everything it did. Its caller
+replays the stored response instead. If the first rolls back, the second
+claim succeeds and proceeds as a first request.
+
+Keys are scoped per user, kept for ``IDEMPOTENCY_KEY_TTL_HOURS`` and then
+ignored and pruned by ``manage.py prune_idempotency_keys``. A key reused
+with a different body gets 422 rather than someone else's response.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+TTL = timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+class KeyConflict(Exception):
+    """Another request claimed the key first."""
+
+
+def digest(value):
+    return hashlib.blake2b(value.encode(), digest_size=16).digest()
+
+
+def fingerprint(data):
+    """Digest of a parsed request body, independent of key order."""
+    return digest(json.dumps(data, sort_keys=True, separators=(',', ':'), default=str))
+
+
+def lookup(user_id, key):
+    """The live record for ``key``, or None. An expired one is deleted."""
+    record = IdempotencyKey.objects.filter(user_id=user_id, key_digest=digest(key)).first()
+    if record is not None and record.created_at < timezone.now() - TTL:
+        record.delete()
+        return None
+    return record
+
+
+def claim(user_id, key, request_digest):
+    """
+    Insert the record for ``key``; call inside the transaction that does
+    the work. Raises KeyConflict, which must abort that transaction, if
+    another request holds the key.
+    """
+    try:
+        return IdempotencyKey.objects.create(
+            user_id=user_id, key_digest=digest(key), request_digest=request_digest
+        )
+    except IntegrityError:
+        raise KeyConflict
+
+
+def complete(record, status_code, body):
+    record.status_code = status_code
+    record.response = body
+    record.save(update_fields=['status_code', 'response'])
+
+
+def replay(record, request_digest):
+    if bytes(record.request_digest) != request_digest:
+        return Response({
+            'status': 'error',
+            'message': f'This {HEADER} was already used with a different request'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
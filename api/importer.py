@@ -0,0 +1,194 @@
+"""
+Bulk import of bank statement CSV files into TransactionDetails.
+
+The file is parsed and validated one line at a time and written in chunks:
+PostgreSQL gets each chunk through ``COPY ... FROM STDIN``, other backends
+fall back to ``bulk_create``. The whole import runs in one DB transaction,
+so either every valid line lands or none do. Invalid lines are skipped and
+reported by line number.
+
+Expected columns (header row required, extra columns ignored)::
+
+    date,amount,transaction_type,description,category
+"""
+import csv
+import io
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import caching, rollups
+from .models import TransactionDetails
+
+REQUIRED_COLUMNS = ('date', 'amount', 'transaction_type')
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d/%m/%Y')
+TRANSACTION_TYPES = {choice for choice, _ in TransactionDetails.TRANSACTION_TYPES}
+MAX_AMOUNT = Decimal('99999999.99')  # DecimalField(max_digits=10, decimal_places=2)
+CHUNK_SIZE = 5000
+
+# Columns written by COPY, in order.
+COPY_FIELDS = (
+    'user', 'amount', 'transaction_type', 'description', 'category', 'date', 'is_recurring', 'updated_at',
+    'change_seq',
+)
+
+
+class StatementImportError(ValueError):
+    """The file as a whole cannot be imported (e.g. missing columns, not UTF-8, not CSV)."""
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    rejects: list = field(default_factory=list)  # [(line_number, message)]
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+
+def _parse_date(value):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f'invalid date {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_row(row, user_id):
+    try:
+        amount = Decimal(row['amount'].strip().replace(',', ''))
+    except (InvalidOperation, AttributeError):
+        raise ValueError(f'invalid amount {row["amount"]!r}')
+    if not amount.is_finite() or amount < Decimal('0.01') or amount > MAX_AMOUNT:
+        raise ValueError(f'amount out of range {row["amount"]!r}')
+    amount = amount.quantize(Decimal('0.01'))
+
+    transaction_type = (row['transaction_type'] or '').strip().upper()
+    if transaction_type not in TRANSACTION_TYPES:
+        raise ValueError(f'invalid transaction_type {row["transaction_type"]!r}')
+
+    description = (row.get('description') or '').strip() or None
+    category = (row.get('category') or '').strip() or None
+    if description and len(description) > 255:
+        raise ValueError('description longer than 255 characters')
+    if category and len(category) > 100:
+        raise ValueError('category longer than 100 characters')
+
+    return TransactionDetails(
+        user_id=user_id,
+        amount=amount,
+        transaction_type=transaction_type,
+        description=description,
+        category=category,
+        date=_parse_date(row['date'] or ''),
+        is_recurring=False,
+    )
+
+
+def parse_rows(lines, user_id, rejects):
+    """
+    Yield an unsaved TransactionDetails for each valid line of ``lines``.
+
+    Invalid lines are appended to ``rejects`` as ``(line_number, message)``.
+    """
+    reader = csv.DictReader(lines)
+    rows = _read(reader)
+    fieldnames = next(rows) or ()
+    missing = [column for column in REQUIRED_COLUMNS if column not in fieldnames]
+    if missing:
+        raise StatementImportError(f'missing required columns: {", ".join(missing)}')
+    for row in rows:
+        try:
+            yield _parse_row(row, user_id)
+        except ValueError as e:
+            rejects.append((reader.line_num, str(e)))
+
+
+def _read(reader):
+    """
+    ``reader``'s header and then its rows. Undecodable or malformed input
+    fails the whole file with StatementImportError.
+    """
+    try:
+        yield reader.fieldnames
+        yield from reader
+    except UnicodeDecodeError:
+        raise StatementImportError('file is not UTF-8 text')
+    except csv.Error as e:
+        raise StatementImportError(f'malformed CSV at line {reader.line_num}: {e}')
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy_chunk(cursor, chunk, change_seq):
+    opts = TransactionDetails._meta
+    columns = ', '.join(connection.ops.quote_name(opts.get_field(name).column) for name in COPY_FIELDS)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # COPY skips auto_now, so stamp updated_at for delta sync ourselves.
+    now = timezone.now()
+    for txn in chunk:
+        txn.updated_at = now
+        writer.writerow([
+            txn.user_id, txn.amount, txn.transaction_type,
+            txn.description, txn.category, txn.date.isoformat(), 'f', now.isoformat(), change_seq,
+        ])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {connection.ops.quote_name(opts.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)',
+        buffer,
+    )
+
+
+def import_transactions(user_id, lines, chunk_size=CHUNK_SIZE):
+    """
+    Import the CSV text stream ``lines`` for ``user_id``; returns ImportResult.
+
+    Empty optional cells are written as NULL by both load paths.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    use_copy = connection.vendor == 'postgresql'
+    with transaction.atomic():
+        # Every imported row becomes visible to delta sync at this one
+        # version, when the import commits.
+        change_seq = caching.bump_transactions_version(user_id)
+        rows = parse_rows(lines, user_id, result.rejects)
+        for chunk in _chunks(rows, chunk_size):
+            if use_copy:
+                with connection.cursor() as cursor:
+                    _copy_chunk(cursor, chunk, change_seq)
+            else:
+                for txn in chunk:
+                    txn.change_seq = change_seq
+                TransactionDetails.objects.bulk_create(chunk, batch_size=1000)
+            # Neither path sends signals, so feed the rollups directly.
+            rollups.record_many(chunk)
+            result.imported += len(chunk)
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,220 @@
+import json
+import platform
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone as dt_timezone
+
+import django
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from rest_framework.test import APIClient
+
+from api import urls
+from api.authentication import token_cache
+from api.benchmarking import rolled_back, seed_population
+from api.models import Item
+
+PASSWORD = 'BenchPass123!'
+PERCENTILES = (50, 95, 99)
+
+
+def _import_file():
+    rows = ''.join(f'2024-01-{day % 28 + 1:02d},{day}.50,EXPENSE,Bench import,Food\n' for day in range(100))
+    return SimpleUploadedFile('statement.csv', ('date,amount,transaction_type,description,category\n' + rows).encode())
+
+
+# url name -> (method, request kwargs for APIClient, built per call from the seeded context).
+ENDPOINTS = {
+    'api-root': ('get', lambda c: {}),
+    'item-list': ('get', lambda c: {}),
+    'item-detail': ('get', lambda c: {}),
+    'userdetails-list': ('get', lambda c: {}),
+    'userdetails-detail': ('get', lambda c: {}),
+    'create-user': ('post', lambda c: {'data': {
+        'name': 'Bench Signup', 'phone_number': '+15550000000', 'age': 30,
+        'bank_account_name': 'Bench', 'password': PASSWORD,
+    }, 'format': 'json'}),
+    'get-all-users': ('get', lambda c: {}),
+    'login_user': ('post', lambda c: {'data': {
+        'phone_number': c['login'].phone_number, 'password': PASSWORD,
+    }, 'format': 'json'}),
+    'create-user-async': ('post', lambda c: {'data': {
+        'name': 'Bench Signup', 'phone_number': '+15550000000', 'age': 30,
+        'bank_account_name': 'Bench', 'password': PASSWORD,
+    }, 'format': 'json'}),
+    'login-user-async': ('post', lambda c: {'data': {
+        'phone_number': c['login'].phone_number, 'password': PASSWORD,
+    }, 'format': 'json'}),
+    'create-transaction': ('post', lambda c: {'data': {
+        'amount': '12.50', 'transaction_type': 'EXPENSE', 'category': 'Food',
+    }, 'format': 'json'}),
+    'list-transactions': ('get', lambda c: {}),
+    'create-transactions-batch': ('post', lambda c: {'data': [
+        {'amount': f'{n}.25', 'transaction_type': 'EXPENSE', 'category': 'Food'} for n in range(1, 101)
+    ], 'format': 'json'}),
+    'sync-transactions': ('get', lambda c: {}),
+    'search-transactions': ('get', lambda c: {'data': {'q': 'groc'}}),
+    'export-transactions': ('get', lambda c: {'data': {'format': 'csv'}}),
+    'import-transactions': ('post', lambda c: {'data': {'file': _import_file()}, 'format': 'multipart'}),
+    'transaction-summary': ('get', lambda c: {}),
+    'transaction-analytics': ('get', lambda c: {}),
+}
+# Views on DRF's default session/basic auth (the API root and the admin
+# viewsets) take a staff session, not an app user's token.
+STAFF_ENDPOINTS = {'api-root', 'item-list', 'item-detail', 'userdetails-list', 'userdetails-detail'}
+# url name -> reverse() kwargs for routes that take arguments.
+URL_KWARGS = {
+    'item-detail': lambda c: {'pk': c['item'].pk},
+    'userdetails-detail': lambda c: {'pk': c['user'].pk},
+}
+
+
+def _all_succeeded(statuses):
+    return all(200 <= status < 300 for status in statuses)
+
+
+def _url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _url_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic population and time every endpoint in api/urls.py through the test client, '
+        'e.g. bench --users 10000 --transactions 1000. Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='users to seed (default 100)')
+        parser.add_argument('--transactions', type=int, default=100,
+                            help='transactions per seeded user (default 100)')
+        parser.add_argument('--requests', type=int, default=50, help='timed requests per endpoint (default 50)')
+        parser.add_argument('--only', action='append', metavar='URL_NAME', help='bench only this endpoint (repeatable)')
+        parser.add_argument('--output', default='bench.json', help='where to write the JSON results (default bench.json)')
+        parser.add_argument('--baseline', help='earlier results file to compare p95 latency against')
+
+    def handle(self, *args, **options):
+        missing = set(_url_names(urls.urlpatterns)) - set(ENDPOINTS)
+        if missing:
+            raise CommandError(f'No bench scenario for: {", ".join(sorted(missing))}')
+        names = options['only'] or list(ENDPOINTS)
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'Unknown endpoint: {", ".join(sorted(unknown))}')
+        if options['users'] < 1 or options['requests'] < 1:
+            raise CommandError('--users and --requests must be positive')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['endpoints']
+
+        results = {}
+        with rolled_back():
+            started = time.perf_counter()
+            users = seed_population(options['users'], options['transactions'], random.Random(0))
+            login = users[-1]
+            login.password = make_password(PASSWORD)
+            login.save(update_fields=['password'])
+            context = {'user': users[0], 'login': login, 'item': Item.objects.create(title='Bench item')}
+            if connection.vendor == 'postgresql':
+                # Without statistics the planner misjudges the freshly seeded
+                # tables and the timings reflect plans production never uses.
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            self.stdout.write(
+                f'Seeded {options["users"]:,} users x {options["transactions"]:,} transactions '
+                f'in {time.perf_counter() - started:.1f}s'
+            )
+
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {context["user"].token}')
+            staff_client = APIClient()
+            staff_client.force_login(User.objects.create_superuser('bench-admin', password=PASSWORD))
+            token_cache.clear()
+            for name in names:
+                results[name] = self.bench(staff_client if name in STAFF_ENDPOINTS else client,
+                                           name, context, options['requests'])
+                self.report(name, results[name], baseline)
+
+        payload = {
+            'meta': {
+                'created_at': datetime.now(dt_timezone.utc).isoformat(),
+                'users': options['users'],
+                'transactions_per_user': options['transactions'],
+                'requests': options['requests'],
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+            },
+            'endpoints': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(payload, f, indent=2, sort_keys=True)
+        failed = sorted(name for name, result in results.items() if not _all_succeeded(result['statuses']))
+        if failed:
+            # The timings of error responses say nothing about the endpoint.
+            raise CommandError(f'Wrote {options["output"]}, but got non-2xx responses from: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+    def bench(self, client, name, context, requests):
+        method, build = ENDPOINTS[name]
+        url = reverse(name, kwargs=URL_KWARGS[name](context) if name in URL_KWARGS else None)
+        send = getattr(client, method)
+
+        def call():
+            response = send(url, **build(context))
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+
+        statuses = {call().status_code}  # warm-up
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = call()
+            timings.append((time.perf_counter() - started) * 1000)
+            statuses.add(response.status_code)
+
+        # Query capture and tracemalloc both slow requests down, so they get
+        # a separate, untimed request.
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                statuses.add(call().status_code)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        latency = dict(zip((f'p{p}_ms' for p in PERCENTILES), np.percentile(timings, PERCENTILES).round(3).tolist()))
+        return {
+            'method': method.upper(),
+            'path': url,
+            'statuses': sorted(statuses),
+            **latency,
+            'mean_ms': round(float(np.mean(timings)), 3),
+            'queries': len(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def report(self, name, result, baseline):
+        line = (
+            f'{name:<26} p50 {result["p50_ms"]:>9.2f}ms  p95 {result["p95_ms"]:>9.2f}ms  '
+            f'p99 {result["p99_ms"]:>9.2f}ms  {result["queries"]:>4} queries  {result["peak_memory_kb"]:>9.1f} KiB'
+        )
+        if baseline and name in baseline and baseline[name]['p95_ms']:
+            change = (result['p95_ms'] / baseline[name]['p95_ms'] - 1) * 100
+            line += f'  p95 {change:+.1f}%'
+        if not _all_succeeded(result['statuses']):
+            self.stdout.write(self.style.WARNING(f'{line}  statuses {result["statuses"]}'))
+        else:
+            self.stdout.write(line)
@@ -0,0 +1,38 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import analytics
+from api.benchmarking import rolled_back, seed_transactions, seed_user
+
+
+class Command(BaseCommand):
+    help = 'Compare the NumPy analytics against the ORM-loop reference on a seeded, rolled-back dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = seed_user()
+            seed_transactions(user, options['transactions'], random.Random(options['seed']))
+
+            date_from, date_to = analytics.default_range(timezone.localdate())
+            timings = {}
+            for name, compute in (('numpy', analytics.compute), ('orm loop', analytics.compute_naive)):
+                runs = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    compute(user, date_from, date_to)
+                    runs.append(time.perf_counter() - started)
+                timings[name] = min(runs)
+                self.stdout.write(f'{name:>9}: best of {options["repeat"]} = {timings[name] * 1000:.1f} ms')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["transactions"]} transactions: numpy is '
+            f'{timings["orm loop"] / timings["numpy"]:.1f}x faster'
+        ))
@@ -0,0 +1,110 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import db_router
+from api.benchmarking import seed_transactions, seed_user
+from api.models import TransactionDetails, UserDetails
+
+ENDPOINTS = ('list-transactions', 'transaction-analytics')
+PERCENTILES = (50, 95, 99)
+REPLICA_WAIT_SECONDS = 30
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the replica-routed read endpoints against the primary and a replica, with a new '
+        'connection per request and with persistent connections. Needs DATABASE_REPLICAS. '
+        'The seeded rows are committed, so the replica can see them, and deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=2000, help='transactions to seed (default 2000)')
+        parser.add_argument('--requests', type=int, default=200, help='timed requests per scenario (default 200)')
+        parser.add_argument('--replica', help='replica alias to read from (default: the first one)')
+        parser.add_argument('--conn-max-age', type=int, default=60,
+                            help='CONN_MAX_AGE for the persistent runs, in seconds (default 60)')
+
+    def handle(self, *args, **options):
+        replicas = db_router.replicas()
+        if not replicas:
+            raise CommandError('No replicas configured; set DATABASE_REPLICAS=host:port')
+        replica = options['replica'] or replicas[0]
+        if replica not in replicas:
+            raise CommandError(f'{replica} is not one of {", ".join(replicas)}')
+        if options['requests'] < 1:
+            raise CommandError('--requests must be positive')
+
+        user = seed_user(random.randrange(10 ** 9))
+        saved_ages = {alias: connections[alias].settings_dict['CONN_MAX_AGE'] for alias in ('default', replica)}
+        try:
+            seed_transactions(user, options['transactions'], random.Random(0))
+            self.wait_for_replica(replica, user, options['transactions'])
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {user.token}')
+            results = {}
+            for label, max_age in (('reconnect', 0), ('persistent', options['conn_max_age'])):
+                for alias in saved_ages:
+                    connections[alias].close()
+                    connections[alias].settings_dict['CONN_MAX_AGE'] = max_age
+                for target in ('default', replica):
+                    with override_settings(DATABASE_REPLICAS=[] if target == 'default' else [replica]):
+                        for name in ENDPOINTS:
+                            results[label, target, name] = self.bench(client, name, options['requests'])
+                            self.report(label, target, name, results[label, target, name])
+        finally:
+            for alias, max_age in saved_ages.items():
+                connections[alias].close()
+                connections[alias].settings_dict['CONN_MAX_AGE'] = max_age
+            # Skip the per-row delete signals (tombstones, rollups): the user goes too.
+            with connections['default'].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {TransactionDetails._meta.db_table} WHERE user_id = %s', [user.pk])
+            UserDetails.objects.filter(pk=user.pk).delete()
+
+        for name in ENDPOINTS:
+            before, after = results['reconnect', 'default', name], results['persistent', replica, name]
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: p50 {before["p50"]:.2f}ms on the primary with a new connection per request, '
+                f'{after["p50"]:.2f}ms on {replica} with persistent connections'
+            ))
+
+    def wait_for_replica(self, replica, user, count):
+        deadline = time.monotonic() + REPLICA_WAIT_SECONDS
+        while TransactionDetails.objects.using(replica).filter(user_id=user.pk).count() < count:
+            if time.monotonic() > deadline:
+                raise CommandError(f'{replica} did not catch up within {REPLICA_WAIT_SECONDS}s')
+            time.sleep(0.1)
+
+    def bench(self, client, name, requests):
+        url = reverse(name)
+
+        def call():
+            # The test client leaves connections alone; do what
+            # request_started and request_finished do for a real request.
+            close_old_connections()
+            try:
+                return client.get(url).status_code
+            finally:
+                close_old_connections()
+
+        statuses = {call()}  # warm-up
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            statuses.add(call())
+            timings.append((time.perf_counter() - started) * 1000)
+        if statuses != {200}:
+            raise CommandError(f'{name} answered {sorted(statuses)}')
+        return dict(zip((f'p{p}' for p in PERCENTILES), np.percentile(timings, PERCENTILES).tolist()))
+
+    def report(self, label, target, name, result):
+        self.stdout.write(
+            f'{label:<10} {target:<10} {name:<22} p50 {result["p50"]:>7.2f}ms  '
+            f'p95 {result["p95"]:>7.2f}ms  p99 {result["p99"]:>7.2f}ms'
+        )
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from api import hashing
+from api.models import UserDetails
+
+PHONE_NUMBER = '+19990000000'
+PASSWORD = 'BenchPass123!'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare login throughput of one worker: the sync login_user view handling requests one at a '
+        'time vs. login_user_async handling them concurrently with PBKDF2 in the hashing pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=32)
+        parser.add_argument('--concurrency', type=int, default=16)
+
+    def handle(self, *args, **options):
+        # The async views read through other threads' connections, so the
+        # user has to be committed rather than seeded in a rolled-back block.
+        user = UserDetails.objects.create(
+            name='Login Bench', phone_number=PHONE_NUMBER, age=30,
+            bank_account_name='Bench', password=PASSWORD
+        )
+        try:
+            body = json.dumps({'phone_number': PHONE_NUMBER, 'password': PASSWORD})
+            sync_rate = self.bench_sync(body, options['requests'])
+            async_rate, rejected = asyncio.run(self.bench_async(body, options['requests'], options['concurrency']))
+        finally:
+            user.delete()
+
+        self.stdout.write(f' sync: {sync_rate:.1f} logins/sec (sequential)')
+        self.stdout.write(
+            f'async: {async_rate:.1f} logins/sec (concurrency {options["concurrency"]}, '
+            f'pool {hashing.POOL_SIZE}, {rejected} shed with 503)'
+        )
+        self.stdout.write(self.style.SUCCESS(f'{async_rate / sync_rate:.1f}x throughput per worker'))
+
+    def bench_sync(self, body, requests):
+        client = Client()
+        url = reverse('login_user')
+        started = time.perf_counter()
+        for _ in range(requests):
+            assert client.post(url, body, content_type='application/json').status_code == 200
+        return requests / (time.perf_counter() - started)
+
+    async def bench_async(self, body, requests, concurrency):
+        client = AsyncClient()
+        url = reverse('login-user-async')
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = []
+
+        async def login():
+            async with semaphore:
+                response = await client.post(url, body, content_type='application/json')
+                statuses.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        return statuses.count(200) / elapsed, statuses.count(503)
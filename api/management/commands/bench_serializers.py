@@ -0,0 +1,51 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarking import rolled_back, seed_transactions, seed_user
+from api.models import TransactionDetails
+from api.renderers import ORJSONRenderer
+from api.serializers import TransactionDetailsReadSerializer, TransactionDetailsSerializer
+
+
+class Command(BaseCommand):
+    help = 'Measure list rendering rows/sec: ModelSerializer + JSONRenderer vs values() + ORJSONRenderer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with rolled_back():
+            user = seed_user()
+            seed_transactions(user, rows, random.Random(0))
+            queryset = TransactionDetails.objects.filter(user=user).order_by('-date', '-id')
+
+            def before():
+                return JSONRenderer().render({'data': TransactionDetailsSerializer(queryset.all(), many=True).data})
+
+            def after():
+                rows = TransactionDetailsReadSerializer.values(queryset.all())
+                return ORJSONRenderer().render({'data': TransactionDetailsReadSerializer.many(rows)})
+
+            if before() != after():
+                raise CommandError('Fast path output differs from ModelSerializer output')
+
+            rates = {}
+            for name, run in (('before', before), ('after', after)):
+                best = min(self.timed(run) for _ in range(repeat))
+                rates[name] = rows / best
+                self.stdout.write(f'{name:>6}: {rates[name]:,.0f} rows/sec')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Byte-identical output, {rates["after"] / rates["before"]:.1f}x rows/sec'
+        ))
+
+    @staticmethod
+    def timed(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import writebehind
+from api.benchmarking import seed_user
+from api.models import TransactionDetails, UserDetails
+
+PERCENTILES = (50, 95, 99)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure create_transaction throughput and latency from concurrent threads, writing each '
+        'row directly and through the write-behind queue. Rows are committed and deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='concurrent clients (default 16)')
+        parser.add_argument('--requests', type=int, default=100, help='requests per client (default 100)')
+        parser.add_argument('--batch-size', type=int, default=writebehind.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--window-ms', type=int, default=writebehind.DEFAULT_WINDOW_MS)
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['requests'] < 1:
+            raise CommandError('--threads and --requests must be positive')
+        # One user per client, like real traffic; a shared user would
+        # serialize every commit on its rollup rows.
+        users = [seed_user(900_000_000 + index) for index in range(options['threads'])]
+        try:
+            results = {}
+            for mode, enabled in (('direct', False), ('write-behind', True)):
+                writebehind.reset_queue()
+                with override_settings(TRANSACTION_WRITE_BEHIND=enabled,
+                                       TRANSACTION_WRITE_BEHIND_BATCH_SIZE=options['batch_size'],
+                                       TRANSACTION_WRITE_BEHIND_WINDOW_MS=options['window_ms']):
+                    results[mode] = self.run(users, options['requests'])
+                    if enabled:
+                        queue = writebehind.get_queue()
+                        results[mode]['mean_batch'] = queue.written / max(queue.batches, 1)
+                    writebehind.reset_queue()
+                self.report(mode, results[mode])
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {TransactionDetails._meta.db_table} WHERE user_id = ANY(%s)',
+                               [[user.pk for user in users]])
+            UserDetails.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'write-behind: {results["write-behind"]["per_second"] / results["direct"]["per_second"]:.1f}x '
+            f'the throughput, p99 {results["write-behind"]["p99"] - results["direct"]["p99"]:+.2f}ms'
+        ))
+
+    def run(self, users, requests):
+        barrier = threading.Barrier(len(users) + 1)
+        timings, statuses = [], set()
+
+        def client(user):
+            api = APIClient()
+            api.credentials(HTTP_AUTHORIZATION=f'Token {user.token}')
+            payload = {'amount': '12.50', 'transaction_type': 'EXPENSE', 'category': 'Food'}
+            own = []
+            barrier.wait()
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    statuses.add(api.post(reverse('create-transaction'), payload, format='json').status_code)
+                    own.append((time.perf_counter() - started) * 1000)
+            finally:
+                timings.extend(own)
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if statuses != {201}:
+            raise CommandError(f'create_transaction answered {sorted(statuses)}')
+        latency = dict(zip((f'p{p}' for p in PERCENTILES), np.percentile(timings, PERCENTILES).tolist()))
+        return {'per_second': len(timings) / elapsed, **latency}
+
+    def report(self, mode, result):
+        line = (
+            f'{mode:<13} {result["per_second"]:>8.0f} req/s  p50 {result["p50"]:>7.2f}ms  '
+            f'p95 {result["p95"]:>7.2f}ms  p99 {result["p99"]:>7.2f}ms'
+        )
+        if 'mean_batch' in result:
+            line += f'  mean batch {result["mean_batch"]:.1f}'
+        self.stdout.write(line)
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import topspending
+from api.models import UserDetails
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-month top-k expense categories (settings.TOP_SPENDING_K) in TopSpending.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', metavar='USER_ID',
+                            help='only this user (repeatable; default all users)')
+        parser.add_argument('--since', metavar='YYYY-MM', help='first month to rebuild (default all)')
+        parser.add_argument('--method', choices=topspending.METHODS,
+                            help='rank with SQL window functions or a Python heap (default sql when supported)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--since must be YYYY-MM')
+        users = options['users']
+        if users:
+            unknown = set(users) - set(UserDetails.objects.filter(user_id__in=users).values_list('user_id', flat=True))
+            if unknown:
+                raise CommandError(f'Unknown user_id: {", ".join(sorted(unknown))}')
+
+        written = topspending.compute(user_ids=users, since=since, method=options['method'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} TopSpending rows'))
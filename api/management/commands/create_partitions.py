@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.partitioning import PARTITIONS_AHEAD, PartitioningError, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the monthly transaction partitions up to --ahead months from now. '
+        'Idempotent; run it regularly, e.g. daily from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=PARTITIONS_AHEAD,
+                            help=f'months to create beyond the current one (default {PARTITIONS_AHEAD})')
+        parser.add_argument('--since', metavar='YYYY-MM',
+                            help='also create past months from here on, moving their rows out of the DEFAULT partition')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL')
+        first = None
+        if options['since']:
+            try:
+                first = datetime.strptime(options['since'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--since must be YYYY-MM')
+
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                created = ensure_partitions(cursor, first, options['ahead'])
+        except PartitioningError as e:
+            raise CommandError(str(e))
+
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} partitions created'))
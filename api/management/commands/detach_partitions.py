@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.partitioning import PartitioningError, detach_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Detach monthly transaction partitions older than --before into standalone tables for archiving. '
+        'Their rows disappear from the API; daily Statistics and balances keep counting them, and '
+        'reconcile_balances reads the archive tables while they exist.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', metavar='YYYY-MM', required=True,
+                            help='detach every month partition older than this month')
+        parser.add_argument('--concurrently', action='store_true',
+                            help='DETACH ... CONCURRENTLY, one partition per transaction, without blocking queries')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL')
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError('--before must be YYYY-MM')
+
+        try:
+            with connection.cursor() as cursor:
+                if options['concurrently']:
+                    # Not allowed inside a transaction block; autocommit per statement.
+                    detached = detach_partitions(cursor, before, concurrently=True)
+                else:
+                    with transaction.atomic():
+                        detached = detach_partitions(cursor, before)
+        except PartitioningError as e:
+            raise CommandError(str(e))
+
+        for name in detached:
+            self.stdout.write(f'Detached {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(detached)} partitions detached'))
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import CHUNK_SIZE, StatementImportError, import_transactions
+from api.models import UserDetails
+
+
+class Command(BaseCommand):
+    help = 'Bulk import a bank statement CSV (date,amount,transaction_type,description,category) for one user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_id', help='UserDetails.user_id that owns the imported rows')
+        parser.add_argument('path', help='CSV file to import, or - for stdin')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help=f'rows per COPY/bulk_create chunk (default {CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        user_id = options['user_id']
+        if not UserDetails.objects.filter(user_id=user_id).exists():
+            raise CommandError(f'No UserDetails with user_id {user_id!r}')
+
+        try:
+            if options['path'] == '-':
+                result = import_transactions(user_id, sys.stdin, options['chunk_size'])
+            else:
+                with open(options['path'], newline='', encoding='utf-8-sig') as lines:
+                    result = import_transactions(user_id, lines, options['chunk_size'])
+        except (OSError, StatementImportError) as e:
+            raise CommandError(str(e))
+
+        for line_number, message in result.rejects:
+            self.stderr.write(f'line {line_number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} rows in {result.seconds:.2f}s '
+            f'({result.rows_per_second:,.0f} rows/sec), rejected {len(result.rejects)}'
+        ))
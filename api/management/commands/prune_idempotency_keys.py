@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.idempotency import TTL
+from api.models import IdempotencyKey
+
+DEFAULT_HOURS = int(TTL.total_seconds() // 3600)
+
+
+class Command(BaseCommand):
+    help = 'Delete Idempotency-Key records older than their TTL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=DEFAULT_HOURS,
+                            help=f'retention in hours (default {DEFAULT_HOURS})')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} idempotency keys older than {options["hours"]} hours'))
@@ -0,0 +1,264 @@
+"""
+Per-route request metrics, exposed at ``/metrics`` in the Prometheus text
+format.
+
+``MetricsMiddleware`` times each request and counts its DB queries and DB
+time. It files them under the URL pattern that matched
+(``/api/v1/transactions/``, never the raw path), the method and the status
+code. Methods outside the standard set are filed as ``other``.
+
+Queries are counted by an execute wrapper installed on every connection
+when it is created. The wrapper reports to the request's ``QueryTimer``
+through a context variable. Under ASGI, Django runs sync views on a worker
+thread with that thread's own connections. The context variable follows
+the view there, so those queries are counted too.
+
+Every thread records into its own shard, so the request path takes no
+locks. Shards are only merged when ``/metrics`` is scraped. The shards of
+threads that have exited are folded into one, so a thread-per-request
+server doesn't grow the list. Counts are per process; Prometheus sums them
+across workers.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+UNMATCHED_ROUTE = '<unmatched>'
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+OTHER_METHOD = 'other'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RouteStats:
+    __slots__ = ('count', 'latency', 'latency_sum', 'queries', 'query_sum', 'db_seconds', 'response_bytes')
+
+    def __init__(self):
+        self.count = 0
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.queries = [0] * (len(QUERY_BUCKETS) + 1)
+        self.query_sum = 0
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+
+    def add(self, other):
+        self.count += other.count
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        self.latency_sum += other.latency_sum
+        self.queries = [a + b for a, b in zip(self.queries, other.queries)]
+        self.query_sum += other.query_sum
+        self.db_seconds += other.db_seconds
+        self.response_bytes += other.response_bytes
+
+
+def _merge(into, shard):
+    # Copy first: the owning thread may add a key meanwhile.
+    for key, stats in list(shard.items()):
+        into.setdefault(key, RouteStats()).add(stats)
+
+
+class Registry:
+    """Per-thread ``{(route, method, status): RouteStats}`` shards."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # guards the shard map and _retired, not live shards
+        self._shards = {}  # thread -> its shard
+        self._retired = {}  # merged shards of threads that have exited
+
+    def _shard(self):
+        try:
+            return self._local.stats
+        except AttributeError:
+            stats = self._local.stats = {}
+            with self._lock:
+                self._prune()
+                self._shards[threading.current_thread()] = stats
+            return stats
+
+    def _prune(self):
+        """Fold the shards of exited threads into ``_retired``; call with the lock held."""
+        for thread in [thread for thread in self._shards if not thread.is_alive()]:
+            _merge(self._retired, self._shards.pop(thread))
+
+    def observe(self, route, method, status, seconds, queries, db_seconds, response_bytes):
+        shard = self._shard()
+        key = (route, method, status)
+        stats = shard.get(key)
+        if stats is None:
+            stats = shard[key] = RouteStats()
+        stats.count += 1
+        stats.latency[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.latency_sum += seconds
+        stats.queries[bisect_left(QUERY_BUCKETS, queries)] += 1
+        stats.query_sum += queries
+        stats.db_seconds += db_seconds
+        stats.response_bytes += response_bytes
+
+    def snapshot(self):
+        merged = {}
+        with self._lock:
+            self._prune()
+            _merge(merged, self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            _merge(merged, shard)
+        return merged
+
+    def clear(self):
+        with self._lock:
+            self._retired.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+
+registry = Registry()
+_timer = ContextVar('metrics_query_timer', default=None)
+
+
+class QueryTimer:
+    """``execute_wrapper`` hook counting queries and the time spent in them."""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def _execute(execute, sql, params, many, context):
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def _install(connection, **kwargs):
+    # At the front, where the append()/pop() of execute_wrapper() blocks
+    # can't remove it.
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+
+connection_created.connect(_install)
+
+
+class MetricsMiddleware:
+    """Records every request into ``registry``; put it first in MIDDLEWARE."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            _install(connection)  # opened before this module was imported
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        token = _timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        _observe(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        token = _timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        _observe(request, response, time.perf_counter() - started, timer)
+        return response
+
+
+def _observe(request, response, seconds, timer):
+    match = request.resolver_match
+    if match and match.view_name == 'metrics':
+        return
+    route = f'/{match.route}' if match else UNMATCHED_ROUTE
+    response_bytes = 0 if response.streaming else len(response.content)
+    method = request.method if request.method in METHODS else OTHER_METHOD
+    registry.observe(route, method, response.status_code, seconds,
+                     timer.count, timer.seconds, response_bytes)
+
+
+def _labels(route, method, status):
+    route = route.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'route="{route}",method="{method}",status="{status}"'
+
+
+def _histogram(lines, name, bounds, counts, total, count, labels):
+    running = 0
+    for bound, bucket in zip((*bounds, '+Inf'), counts):
+        running += bucket
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {running}')
+    lines.append(f'{name}_sum{{{labels}}} {total}')
+    lines.append(f'{name}_count{{{labels}}} {count}')
+
+
+def render(snapshot):
+    families = {
+        'http_request_duration_seconds': ('histogram', 'Request latency by route.', []),
+        'http_request_db_queries': ('histogram', 'DB queries per request by route.', []),
+        'http_request_db_duration_seconds_total': ('counter', 'Time spent in DB queries by route.', []),
+        'http_response_size_bytes_total': ('counter', 'Response body bytes by route (streaming responses excluded).', []),
+    }
+    for (route, method, status), stats in sorted(snapshot.items()):
+        labels = _labels(route, method, status)
+        _histogram(families['http_request_duration_seconds'][2], 'http_request_duration_seconds',
+                   LATENCY_BUCKETS, stats.latency, stats.latency_sum, stats.count, labels)
+        _histogram(families['http_request_db_queries'][2], 'http_request_db_queries',
+                   QUERY_BUCKETS, stats.queries, stats.query_sum, stats.count, labels)
+        families['http_request_db_duration_seconds_total'][2].append(
+            f'http_request_db_duration_seconds_total{{{labels}}} {stats.db_seconds}')
+        families['http_response_size_bytes_total'][2].append(
+            f'http_response_size_bytes_total{{{labels}}} {stats.response_bytes}')
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus scrape target. When ``settings.METRICS_TOKEN`` is set the
+    scraper must send ``Authorization: Bearer <token>``.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        sent = request.headers.get('Authorization', '')
+        if not constant_time_compare(sent, f'Bearer {token}'):
+            return HttpResponseForbidden()
+    return HttpResponse(render(registry.snapshot()), content_type=CONTENT_TYPE)
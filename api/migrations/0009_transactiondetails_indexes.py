@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_alter_transactiondetails_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transactiondetails',
+            index=models.Index(fields=['user', '-date', '-id'], name='txn_user_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactiondetails',
+            index=models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='transactiondetails',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transaction_details', to='api.userdetails'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_statistics(apps, schema_editor):
+    """Seed the rollups from existing transactions with one grouped query."""
+    TransactionDetails = apps.get_model('api', 'TransactionDetails')
+    Statistics = apps.get_model('api', 'Statistics')
+    rows = (
+        TransactionDetails.objects
+        .annotate(day=TruncDate('date'))
+        .values('user_id', 'day')
+        .annotate(
+            income=Sum('amount', filter=Q(transaction_type='INCOME'), default=0),
+            expense=Sum('amount', filter=Q(transaction_type='EXPENSE'), default=0),
+        )
+        .order_by()
+    )
+    Statistics.objects.bulk_create(
+        (
+            Statistics(user_id=row['user_id'], date=row['day'],
+                       total_income=row['income'], total_expense=row['expense'])
+            for row in rows.iterator(chunk_size=2000)
+            if row['income'] or row['expense']
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_transactiondetails_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Statistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='api.userdetails')),
+            ],
+            options={
+                'verbose_name_plural': 'Statistics',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='statistics',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='statistics_user_date_uniq'),
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
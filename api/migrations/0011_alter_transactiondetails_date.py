@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_statistics'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transactiondetails',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_alter_transactiondetails_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userdetails',
+            index=models.Index(fields=['name', 'user_id'], name='userdetails_name_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:49
+
+import calendar
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# api.recurring's schedule as of this migration; copied so that later changes
+# there can't alter what this migration does.
+FREQUENCIES = {
+    'daily': ('days', 1),
+    'weekly': ('days', 7),
+    'biweekly': ('days', 14),
+    'monthly': ('months', 1),
+    'quarterly': ('months', 3),
+    'yearly': ('months', 12),
+}
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    year, month = value.year + month // 12, month % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_after(anchor, frequency, moment):
+    unit, step = FREQUENCIES[frequency.strip().lower()]
+    if moment < anchor:
+        return anchor
+    if unit == 'days':
+        interval = timedelta(days=step)
+        return anchor + interval * ((moment - anchor) // interval + 1)
+    anchor = timezone.localtime(anchor)
+    moment = timezone.localtime(moment)
+    count = ((moment.year - anchor.year) * 12 + moment.month - anchor.month) // step
+    while True:
+        candidate = _add_months(anchor, count * step)
+        if candidate > moment:
+            return candidate
+        count += 1
+
+
+def schedule_existing_templates(apps, schema_editor):
+    """
+    Give existing recurring templates their next run after today. Nothing
+    was ever materialized for them, and back-filling years of occurrences
+    nobody asked for would distort every balance.
+    """
+    TransactionDetails = apps.get_model('api', 'TransactionDetails')
+    now = timezone.now()
+    templates = []
+    for template in TransactionDetails.objects.filter(is_recurring=True).only('date', 'recurring_frequency').iterator(chunk_size=2000):
+        if (template.recurring_frequency or '').strip().lower() in FREQUENCIES:
+            template.next_run = occurrence_after(template.date, template.recurring_frequency, max(template.date, now))
+            templates.append(template)
+    TransactionDetails.objects.bulk_update(templates, ['next_run'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_transaction_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactiondetails',
+            name='next_run',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transactiondetails',
+            name='recurring_source',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='api.transactiondetails'),
+        ),
+        migrations.AddIndex(
+            model_name='transactiondetails',
+            index=models.Index(condition=models.Q(('next_run__isnull', False)), fields=['next_run', 'user'], name='txn_recurring_next_run_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transactiondetails',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurring_source__isnull', False)), fields=('recurring_source', 'date'), name='txn_recurring_occurrence_uniq'),
+        ),
+        migrations.RunPython(schedule_existing_templates, migrations.RunPython.noop),
+    ]
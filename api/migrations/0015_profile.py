@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def create_profiles(apps, schema_editor):
+    """One profile per existing user, its balance from one grouped query."""
+    UserDetails = apps.get_model('api', 'UserDetails')
+    Profile = apps.get_model('api', 'Profile')
+    rows = (
+        UserDetails.objects
+        .values('user_id')
+        .annotate(
+            income=Sum('transaction_details__amount',
+                       filter=Q(transaction_details__transaction_type='INCOME'), default=0),
+            expense=Sum('transaction_details__amount',
+                        filter=Q(transaction_details__transaction_type='EXPENSE'), default=0),
+        )
+        .order_by()
+    )
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=row['user_id'], total_balance=row['income'] - row['expense'])
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_transactiondetails_recurring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile_picture', models.URLField(blank=True, null=True)),
+                ('total_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('frequently_sent_to', models.ManyToManyField(blank=True, related_name='sent_to_by', to='api.userdetails')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to='api.userdetails')),
+            ],
+        ),
+        migrations.RunPython(create_profiles, migrations.RunPython.noop),
+    ]
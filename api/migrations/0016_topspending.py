@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopSpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('category', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='top_spending', to='api.userdetails')),
+            ],
+            options={
+                'verbose_name_plural': 'Top Spending',
+                'ordering': ['user', '-period', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='topspending',
+            constraint=models.UniqueConstraint(fields=('user', 'period', 'rank'), name='topspending_user_period_rank_uniq'),
+        ),
+    ]
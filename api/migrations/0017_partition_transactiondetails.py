@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _rebuild(partitioned):
+    def rebuild(apps, schema_editor):
+        # Declarative partitioning is PostgreSQL-only; elsewhere the table
+        # stays a plain table and everything works unpartitioned.
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        from api.partitioning import rebuild_table
+        rebuild_table(schema_editor, apps.get_model('api', 'TransactionDetails'), partitioned)
+    return rebuild
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_topspending'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transactiondetails',
+            name='recurring_source',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='api.transactiondetails'),
+        ),
+        # Copies every row under an exclusive lock. On a large table, run it
+        # in a maintenance window.
+        migrations.RunPython(_rebuild(partitioned=True), _rebuild(partitioned=False)),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:20
+
+from django.db import migrations
+
+
+def add_search_index(apps, schema_editor):
+    # Full-text search is PostgreSQL-only; elsewhere api.search falls back
+    # to unindexed icontains matching.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from api import partitioning, search
+    model = apps.get_model('api', 'TransactionDetails')
+    with schema_editor.connection.cursor() as cursor:
+        partitioned = partitioning.is_partitioned(cursor, model._meta.db_table)
+    if partitioned:
+        partitioning.add_index(schema_editor, model, search.SEARCH_INDEX)
+    else:
+        schema_editor.add_index(model, search.SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from api import search
+    schema_editor.remove_index(apps.get_model('api', 'TransactionDetails'), search.SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_partition_transactiondetails'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+DATE_INDEX = models.Index(fields=['-date', '-id'], name='txn_date_id_idx')
+
+
+def add_date_index(apps, schema_editor):
+    model = apps.get_model('api', 'TransactionDetails')
+    if schema_editor.connection.vendor == 'postgresql':
+        from api import partitioning
+        with schema_editor.connection.cursor() as cursor:
+            partitioned = partitioning.is_partitioned(cursor, model._meta.db_table)
+        if partitioned:
+            # Per-partition copies named like create_partition's.
+            partitioning.add_index(schema_editor, model, DATE_INDEX)
+            return
+    schema_editor.add_index(model, DATE_INDEX)
+
+
+def remove_date_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('api', 'TransactionDetails'), DATE_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_date_index, remove_date_index)],
+            state_operations=[migrations.AddIndex(model_name='transactiondetails', index=DATE_INDEX)],
+        ),
+        migrations.AddIndex(
+            model_name='userdetails',
+            index=models.Index(fields=['phone_number'], name='userdetails_phone_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='transactions_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
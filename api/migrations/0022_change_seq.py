@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+CHANGE_SEQ_INDEX = models.Index(fields=['user', 'change_seq', 'id'], name='txn_user_change_seq_id_idx')
+
+
+def add_change_seq_index(apps, schema_editor):
+    model = apps.get_model('api', 'TransactionDetails')
+    if schema_editor.connection.vendor == 'postgresql':
+        from api import partitioning
+        with schema_editor.connection.cursor() as cursor:
+            partitioned = partitioning.is_partitioned(cursor, model._meta.db_table)
+        if partitioned:
+            partitioning.add_index(schema_editor, model, CHANGE_SEQ_INDEX)
+            return
+    schema_editor.add_index(model, CHANGE_SEQ_INDEX)
+
+
+def remove_change_seq_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('api', 'TransactionDetails'), CHANGE_SEQ_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_profile_transactions_version'),
+    ]
+
+    # Existing rows keep change_seq 0; clients holding the old (updated_at, id)
+    # cursors get a 410 and download everything again.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transactiondetails',
+            name='txn_user_updated_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='transactiontombstone',
+            name='tombstone_user_deleted_idx',
+        ),
+        migrations.AddField(
+            model_name='transactiondetails',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='transactiontombstone',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_change_seq_index, remove_change_seq_index)],
+            state_operations=[migrations.AddIndex(model_name='transactiondetails', index=CHANGE_SEQ_INDEX)],
+        ),
+        migrations.AddIndex(
+            model_name='transactiontombstone',
+            index=models.Index(fields=['user_id', 'change_seq'], name='tombstone_user_change_seq_idx'),
+        ),
+    ]
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 import uuid
 import secrets
 from django.contrib.auth.hashers import make_password, check_password
 from decimal import Decimal
+from django.utils import timezone
 
 # Create your models here.
 
@@ -52,12 +53,29 @@ class UserDetails(models.Model):
     def check_password(self, raw_password):
         return check_password(raw_password, self.password)
 
+    # Lets DRF permission classes treat a token-authenticated UserDetails
+    # like a logged-in django.contrib.auth user.
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
     def __str__(self):
         return f"{self.name} ({self.user_id})"
 
     class Meta:
         verbose_name = 'User Detail'
         verbose_name_plural = 'User Details'
+        indexes = [
+            # get_all_users keyset ordering.
+            models.Index(fields=['name', 'user_id'], name='userdetails_name_idx'),
+            # Login lookups and the admin's prefix search; pattern_ops so
+            # LIKE 'prefix%' can use it under any collation.
+            models.Index(fields=['phone_number'], name='userdetails_phone_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
 class TransactionDetails(models.Model):
     TRANSACTION_TYPES = [
@@ -67,18 +85,173 @@ class TransactionDetails(models.Model):
         ('REFUND', 'Refund'),
     ]
 
-    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='transaction_details', to_field='user_id')
+    # No standalone FK index: the composite indexes below lead with user.
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='transaction_details', to_field='user_id', db_index=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     transaction_type = models.CharField(max_length=8, choices=TRANSACTION_TYPES)
     description = models.CharField(max_length=255, blank=True, null=True)
     category = models.CharField(max_length=100, blank=True, null=True)  # e.g., 'Food', 'Transport', 'Salary'
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=timezone.now)  # imports carry historical dates
     is_recurring = models.BooleanField(default=False)
     recurring_frequency = models.CharField(max_length=20, blank=True, null=True)  # e.g., 'monthly', 'weekly'
+    # When the next occurrence of a recurring template is due; maintained by
+    # api.recurring and NULL for everything that is not a live template.
+    next_run = models.DateTimeField(blank=True, null=True, editable=False)
+    # The template a materialized occurrence was generated from. Indexed by
+    # txn_recurring_occurrence_uniq, which leads with it. No DB-level
+    # constraint: nothing can reference a partitioned table's rows by id
+    # alone (see api.partitioning); Django still applies SET_NULL.
+    recurring_source = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, blank=True, null=True, editable=False,
+        related_name='occurrences', db_index=False, db_constraint=False
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # The profile's transactions_version that the last write of this row got
+    # from api.caching.bump_transactions_version; v1/transactions/sync/ pages
+    # on it. Saves stamp it (api.signals); bulk inserts and QuerySet.update()
+    # callers must stamp it themselves or sync will not see the change.
+    change_seq = models.BigIntegerField(default=0, editable=False)
     
+    # On PostgreSQL the table is range-partitioned by month on ``date``
+    # (migration 0017, api.partitioning).
     class Meta:
         ordering = ['-date']
         verbose_name_plural = 'Transaction Details'
+        indexes = [
+            # Per-user history listing, newest first (keyset on date, id).
+            models.Index(fields=['user', '-date', '-id'], name='txn_user_date_id_idx'),
+            # Per-user reporting by category over a date range.
+            models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+            # Delta sync: changes since a (change_seq, id) cursor.
+            models.Index(fields=['user', 'change_seq', 'id'], name='txn_user_change_seq_id_idx'),
+            # Due recurring templates; only live templates carry a next_run.
+            models.Index(
+                fields=['next_run', 'user'], name='txn_recurring_next_run_idx',
+                condition=models.Q(next_run__isnull=False)
+            ),
+            # The admin changelist: every user's rows, newest first.
+            models.Index(fields=['-date', '-id'], name='txn_date_id_idx'),
+        ]
+        constraints = [
+            # At most one materialized occurrence per template and timestamp.
+            models.UniqueConstraint(
+                fields=['recurring_source', 'date'], name='txn_recurring_occurrence_uniq',
+                condition=models.Q(recurring_source__isnull=False)
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The change_seq bump in pre_save must commit together with the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.name} - {self.amount} ({self.transaction_type})"
+
+class TransactionTombstone(models.Model):
+    """
+    Records a deleted TransactionDetails row so delta sync can tell clients
+    to drop it. ``user_id`` is a plain column rather than a foreign key: the
+    tombstones of a user's cascade-deleted transactions must not point at
+    the row being deleted.
+    """
+    user_id = models.CharField(max_length=8)
+    transaction_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    change_seq = models.BigIntegerField(default=0)  # as on TransactionDetails
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'change_seq'], name='tombstone_user_change_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted transaction {self.transaction_id} of {self.user_id}"
+
+class Statistics(models.Model):
+    """
+    Per-user daily income/expense rollup, kept current by ``api.rollups``
+    whenever a TransactionDetails row is written so summaries never have to
+    aggregate the raw transactions.
+    """
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='statistics')
+    date = models.DateField()
+    total_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Statistics'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='statistics_user_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.user_id} on {self.date}"
+
+class TopSpending(models.Model):
+    """
+    A user's biggest expense categories for one calendar month, ranked from
+    1. Written by ``api.topspending``; months that already have rows are
+    refreshed whenever a transaction in them changes.
+    """
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='top_spending', db_index=False)
+    period = models.DateField()  # first day of the month
+    rank = models.PositiveSmallIntegerField()
+    category = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        ordering = ['user', '-period', 'rank']
+        verbose_name_plural = 'Top Spending'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'rank'], name='topspending_user_period_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} {self.category} - {self.amount} ({self.user_id}, {self.period:%Y-%m})"
+
+class Profile(models.Model):
+    """
+    Per-user account summary. ``total_balance`` (income minus expenses) is
+    kept current by ``api.rollups`` on every transaction write; run
+    ``manage.py reconcile_balances`` to check it against the transactions.
+    """
+    user = models.OneToOneField(UserDetails, on_delete=models.CASCADE, related_name='profile', to_field='user_id')
+    profile_picture = models.URLField(null=True, blank=True)
+    total_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    currency = models.CharField(max_length=3, default='USD')  # e.g., USD, EUR, etc.
+    # Bumped in every transaction write's DB transaction; the transaction
+    # read views derive their ETags from it (see api.caching).
+    transactions_version = models.PositiveBigIntegerField(default=0, editable=False)
+    frequently_sent_to = models.ManyToManyField(UserDetails, related_name='sent_to_by', blank=True)
+
+    def __str__(self):
+        return f"Profile for {self.user_id}"
+
+class IdempotencyKey(models.Model):
+    """
+    A create_transaction request made with an ``Idempotency-Key`` header and
+    the response it got, so retries are answered from here (see
+    ``api.idempotency``). Keys are stored as 16-byte digests, and
+    ``manage.py prune_idempotency_keys`` deletes them after their TTL.
+    """
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='idempotency_keys',
+                             to_field='user_id', db_index=False)
+    key_digest = models.BinaryField(max_length=16)
+    request_digest = models.BinaryField(max_length=16)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key_digest'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            # TTL cleanup.
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key_digest.hex()} of {self.user_id}"
@@ -0,0 +1,311 @@
+"""
+Monthly range partitioning of the transactions table on PostgreSQL.
+
+Migration 0017 rebuilds ``api_transactiondetails`` as a table partitioned by
+``RANGE (date)``, with one partition per calendar month (UTC) plus a
+``DEFAULT`` partition that catches rows no month partition covers yet (e.g.
+an import of old statements). Queries with a date bound, such as keyset
+pages of ``list_transactions``, exports and analytics ranges, only touch
+the partitions that bound can reach.
+
+``manage.py create_partitions`` should run regularly (e.g. daily from cron)
+so the coming months exist before rows arrive. A partition is created as a
+plain table, with indexes named after the parent's (``txn_user_date_id_idx``
+becomes ``txn_user_date_id_idx_y2024m01``). Any rows the DEFAULT partition
+holds for that month move into it, and then it is attached.
+``manage.py detach_partitions`` detaches old months into standalone tables
+for archiving.
+
+PostgreSQL requires the primary key of a partitioned table to include the
+partition key, so the table's key is ``(id, date)``. ``id`` stays unique
+because it comes from one identity sequence, and Django still treats it as
+the primary key. For the same reason no foreign key may point at this table.
+"""
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import TransactionDetails
+
+TABLE = TransactionDetails._meta.db_table
+PARTITION_KEY = 'date'
+DEFAULT_SUFFIX = 'default'
+PARTITIONS_AHEAD = 3  # months created beyond the current one
+_SUFFIX = re.compile(r'^y(\d{4})m(\d{2})$')
+_INDEX_DEF = re.compile(r'^CREATE (UNIQUE )?INDEX \S+ ON ONLY \S+ (USING .*)$')
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_suffix(month):
+    return f'y{month.year:04d}m{month.month:02d}'
+
+
+def partition_name(month, table=TABLE):
+    return f'{table}_{partition_suffix(month)}'
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).isoformat()
+
+
+def is_partitioned(cursor, table=TABLE):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def _children(cursor, table):
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [table],
+    )
+    return [name for (name,) in cursor.fetchall()]
+
+
+def partitions(cursor, table=TABLE):
+    """``{month: partition name}`` for the month partitions currently attached."""
+    months = {}
+    for name in _children(cursor, table):
+        match = _SUFFIX.match(name[len(table) + 1:]) if name.startswith(f'{table}_') else None
+        if match:
+            months[date(int(match[1]), int(match[2]), 1)] = name
+    return months
+
+
+def archives(cursor, table=TABLE):
+    """Month partitions detached by ``detach_partitions`` whose tables still exist."""
+    cursor.execute(
+        """
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND relnamespace = current_schema()::regnamespace AND relname LIKE %s
+          AND NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = pg_class.oid)
+        """,
+        [f'{table}\\_y%'],
+    )
+    return sorted(name for (name,) in cursor.fetchall() if _SUFFIX.match(name[len(table) + 1:]))
+
+
+def _has_default(cursor, table):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [f'{table}_{DEFAULT_SUFFIX}'])
+    return cursor.fetchone()[0]
+
+
+def populated_months(cursor, table=TABLE):
+    """
+    The months that hold at least one row, oldest first. Each month
+    partition costs one EXISTS probe. Only the DEFAULT partition, which
+    should stay small, is read row by row.
+    """
+    months = set()
+    for month, name in partitions(cursor, table).items():
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {_quote(name)})')
+        if cursor.fetchone()[0]:
+            months.add(month)
+    if _has_default(cursor, table):
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {_quote(PARTITION_KEY)} AT TIME ZONE 'UTC')::date "
+            f'FROM {_quote(f"{table}_{DEFAULT_SUFFIX}")}'
+        )
+        months.update(month for (month,) in cursor.fetchall())
+    return sorted(months)
+
+
+def _parent_indexes(cursor, table):
+    """``[(name, 'UNIQUE ' or '', definition tail)]`` of the parent's plain indexes."""
+    cursor.execute(
+        """
+        SELECT index_class.relname, pg_get_indexdef(pg_index.indexrelid)
+        FROM pg_index
+        JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = pg_index.indexrelid)
+        """,
+        [table],
+    )
+    indexes = []
+    for name, definition in cursor.fetchall():
+        match = _INDEX_DEF.match(definition)
+        if not match:
+            raise PartitioningError(f'Cannot mirror index {name}: {definition}')
+        indexes.append((name, match[1] or '', match[2]))
+    return indexes
+
+
+def _create_partition(cursor, table, suffix, bounds_sql, moved_rows_sql=None, params=()):
+    name = f'{table}_{suffix}'
+    cursor.execute(f'CREATE TABLE {_quote(name)} (LIKE {_quote(table)})')
+    if moved_rows_sql:
+        cursor.execute(moved_rows_sql.format(partition=_quote(name)), params)
+    # Indexes built up front are adopted by ATTACH instead of it creating
+    # anonymous ones, so EXPLAIN output keeps recognizable names.
+    for index, unique, tail in _parent_indexes(cursor, table):
+        cursor.execute(f'CREATE {unique}INDEX {_quote(f"{index}_{suffix}")} ON {_quote(name)} {tail}')
+    cursor.execute(f'ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(name)} {bounds_sql}')
+    return name
+
+
+def create_partition(cursor, month, table=TABLE):
+    """Create and attach the partition for ``month``, adopting its rows from DEFAULT."""
+    start, end = _bound(month), _bound(add_months(month, 1))
+    moved = None
+    if _has_default(cursor, table):
+        default = _quote(f'{table}_{DEFAULT_SUFFIX}')
+        key = _quote(PARTITION_KEY)
+        moved = (
+            f'WITH moved AS (DELETE FROM {default} WHERE {key} >= %s AND {key} < %s RETURNING *) '
+            'INSERT INTO {partition} SELECT * FROM moved'
+        )
+    return _create_partition(
+        cursor, table, partition_suffix(month), f"FOR VALUES FROM ('{start}') TO ('{end}')",
+        moved, [start, end],
+    )
+
+
+def add_index(schema_editor, model, index):
+    """
+    Add ``index`` to ``model``'s partitioned table. Each partition gets its
+    own copy, named ``{index}_{suffix}`` as ``create_partition`` would name
+    it, and the copies are then attached to the parent index.
+    """
+    table = model._meta.db_table
+    sql = str(index.create_sql(model, schema_editor))
+    schema_editor.execute(sql.replace(f' ON {_quote(table)} ', f' ON ONLY {_quote(table)} ', 1))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT pg_get_indexdef(to_regclass(%s))', [index.name])
+        match = _INDEX_DEF.match(cursor.fetchone()[0])
+        if not match:
+            raise PartitioningError(f'Cannot mirror index {index.name}')
+        unique, tail = match[1] or '', match[2]
+        for child in _children(cursor, table):
+            name = f'{index.name}_{child[len(table) + 1:]}'
+            cursor.execute(f'CREATE {unique}INDEX {_quote(name)} ON {_quote(child)} {tail}')
+            cursor.execute(f'ALTER INDEX {_quote(index.name)} ATTACH PARTITION {_quote(name)}')
+
+
+def create_default_partition(cursor, table=TABLE):
+    return _create_partition(cursor, table, DEFAULT_SUFFIX, 'DEFAULT')
+
+
+def ensure_partitions(cursor, first=None, ahead=PARTITIONS_AHEAD, table=TABLE):
+    """
+    Make sure every month from ``first`` (default: the current month) to
+    ``ahead`` months past the current one has a partition. Returns the
+    names created.
+    """
+    if not is_partitioned(cursor, table):
+        raise PartitioningError(f'{table} is not a partitioned table')
+    current = month_start(timezone.now().astimezone(dt_timezone.utc))
+    month, last = first or current, add_months(current, ahead)
+    existing = partitions(cursor, table)
+    created = []
+    while month <= last:
+        if month not in existing:
+            created.append(create_partition(cursor, month, table))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(cursor, before, concurrently=False, table=TABLE):
+    """
+    Detach every month partition older than the month of ``before``. The
+    tables stay in place, outside the partitioned table, for archiving
+    (e.g. ``pg_dump -t``) and dropping. ``concurrently`` must run outside a
+    transaction block.
+    """
+    if not is_partitioned(cursor, table):
+        raise PartitioningError(f'{table} is not a partitioned table')
+    detached = []
+    mode = ' CONCURRENTLY' if concurrently else ''
+    for month, name in sorted(partitions(cursor, table).items()):
+        if month < month_start(before):
+            cursor.execute(f'ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}{mode}')
+            detached.append(name)
+    return detached
+
+
+def _drop_indexes(cursor, table):
+    """Free the index and key names of ``table``; the copy does not need them."""
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u')", [table]
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {_quote(table)} DROP CONSTRAINT {_quote(name)}')
+    cursor.execute(
+        """
+        SELECT index_class.relname FROM pg_index
+        JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = to_regclass(%s)
+        """,
+        [table],
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f'DROP INDEX {_quote(name)}')
+
+
+def rebuild_table(schema_editor, model, partitioned, ahead=PARTITIONS_AHEAD):
+    """
+    Rebuild ``model``'s table, rows included, either range-partitioned on
+    ``date`` or as a plain table again. Used by migration 0017 in both
+    directions; it holds an exclusive lock on the table for the whole copy.
+    """
+    table = model._meta.db_table
+    old = f'{table}_rebuild'
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE {_quote(table)} RENAME TO {_quote(old)}')
+    with schema_editor.connection.cursor() as cursor:
+        _drop_indexes(cursor, old)
+    execute(
+        f'CREATE TABLE {_quote(table)} (LIKE {_quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY)'
+        + (f' PARTITION BY RANGE ({_quote(PARTITION_KEY)})' if partitioned else '')
+    )
+    primary_key = f'id, {_quote(PARTITION_KEY)}' if partitioned else 'id'
+    execute(f'ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(f"{table}_pkey")} PRIMARY KEY ({primary_key})')
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+    for constraint in model._meta.constraints:
+        schema_editor.add_constraint(model, constraint)
+
+    with schema_editor.connection.cursor() as cursor:
+        if partitioned:
+            cursor.execute(f'SELECT min({_quote(PARTITION_KEY)}) FROM {_quote(old)}')
+            oldest = cursor.fetchone()[0]
+            current = month_start(timezone.now().astimezone(dt_timezone.utc))
+            first = min(month_start(oldest.astimezone(dt_timezone.utc)), current) if oldest else current
+            create_default_partition(cursor, table)
+            ensure_partitions(cursor, first, ahead, table)
+        cursor.execute(f'INSERT INTO {_quote(table)} SELECT * FROM {_quote(old)}')
+        cursor.execute(f'DROP TABLE {_quote(old)}')
+        # The identity sequence was created fresh by LIKE: move it past the
+        # copied ids and give it back the conventional name.
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, 'id'])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT setval(%s, COALESCE((SELECT max(id) FROM {_quote(table)}), 0) + 1, false)', [sequence]
+        )
+        if sequence.split('.')[-1].strip('"') != f'{table}_id_seq':
+            cursor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {_quote(f"{table}_id_seq")}')
+
+    for field in model._meta.local_fields:
+        if field.remote_field and field.db_constraint:
+            execute(schema_editor._create_fk_sql(model, field, '_fk_%(to_table)s_%(to_column)s'))
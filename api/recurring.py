@@ -0,0 +1,195 @@
+"""
+Materialization of recurring transactions.
+
+A TransactionDetails row with ``is_recurring`` and a known
+``recurring_frequency`` is a template: it is itself the first occurrence and
+``next_run`` holds when the next one is due. ``materialize`` takes due
+templates off the partial ``next_run`` index a chunk at a time, inserts every
+occurrence that has come due with one ``bulk_create`` per chunk and moves the
+templates' ``next_run`` forward in the same DB transaction.
+
+Occurrences are counted from the template's own date, so a template on the
+31st lands on the 31st whenever the month has one (the last day otherwise),
+and are unique per (template, date): rerunning after a crash never doubles
+up. Due templates are locked with SKIP LOCKED on PostgreSQL and can be split
+into user-id shards, so any number of workers may run side by side.
+
+A save locks the owner's Profile (the version bump in ``api.caching``)
+before the transaction row, so a chunk takes its owners' Profile locks
+first too, in user_id order. Taking the template first would deadlock
+against a concurrent edit of that template.
+"""
+import calendar
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, rollups
+from .models import Profile, TransactionDetails
+
+# recurring_frequency -> (unit, step); matched case-insensitively.
+FREQUENCIES = {
+    'daily': ('days', 1),
+    'weekly': ('days', 7),
+    'biweekly': ('days', 14),
+    'monthly': ('months', 1),
+    'quarterly': ('months', 3),
+    'yearly': ('months', 12),
+}
+CHUNK_SIZE = 1000
+# Occurrences one template may produce per chunk. A template further behind
+# stays due and is simply picked up again by a later chunk.
+MAX_OCCURRENCES = 366
+USER_ID_SPACE = 16 ** 8  # user_id is 8 hex digits
+
+
+@dataclass
+class MaterializeResult:
+    templates: int = 0
+    created: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+
+def _step(frequency):
+    return FREQUENCIES.get((frequency or '').strip().lower())
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    year, month = value.year + month // 12, month % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_after(anchor, frequency, moment):
+    """The first occurrence of ``anchor`` repeating at ``frequency`` strictly after ``moment``."""
+    unit, step = _step(frequency)
+    if moment < anchor:
+        return anchor
+    if unit == 'days':
+        interval = timedelta(days=step)
+        return anchor + interval * ((moment - anchor) // interval + 1)
+    anchor = timezone.localtime(anchor)
+    moment = timezone.localtime(moment)
+    count = ((moment.year - anchor.year) * 12 + moment.month - anchor.month) // step
+    while True:
+        candidate = _add_months(anchor, count * step)
+        if candidate > moment:
+            return candidate
+        count += 1
+
+
+def schedule(txn):
+    """Set ``txn.next_run`` from its recurring fields. Makes no queries."""
+    if not txn.is_recurring or txn.recurring_source_id or not _step(txn.recurring_frequency):
+        txn.next_run = None
+    elif txn.next_run is None:
+        txn.next_run = occurrence_after(txn.date, txn.recurring_frequency, txn.date)
+    else:
+        # Realigns a pending run after a frequency change; a no-op otherwise.
+        txn.next_run = occurrence_after(txn.date, txn.recurring_frequency, txn.next_run - timedelta(microseconds=1))
+
+
+def shard_bounds(shard, shards):
+    """``(lowest, highest)`` user_id of a shard; open ends are None."""
+    if not 0 <= shard < shards:
+        raise ValueError(f'shard must be in [0, {shards})')
+    lowest = f'{USER_ID_SPACE * shard // shards:08X}' if shard else None
+    highest = f'{USER_ID_SPACE * (shard + 1) // shards:08X}' if shard < shards - 1 else None
+    return lowest, highest
+
+
+def due(now, shard=0, shards=1):
+    templates = TransactionDetails.objects.filter(next_run__lte=now)
+    lowest, highest = shard_bounds(shard, shards)
+    if lowest:
+        templates = templates.filter(user_id__gte=lowest)
+    if highest:
+        templates = templates.filter(user_id__lt=highest)
+    return templates
+
+
+def _occurrences(template, now):
+    """Unsaved occurrences of ``template`` due by ``now``; advances its next_run."""
+    if not _step(template.recurring_frequency):
+        template.next_run = None
+        return []
+    occurrences = []
+    run = template.next_run
+    while run <= now and len(occurrences) < MAX_OCCURRENCES:
+        occurrences.append(TransactionDetails(
+            user_id=template.user_id,
+            amount=template.amount,
+            transaction_type=template.transaction_type,
+            description=template.description,
+            category=template.category,
+            date=run,
+            recurring_source_id=template.pk,
+        ))
+        run = occurrence_after(template.date, template.recurring_frequency, run)
+    template.next_run = run
+    return occurrences
+
+
+def materialize_chunk(now, shard=0, shards=1, chunk_size=CHUNK_SIZE):
+    """Materialize one chunk of due templates; returns ``(templates, created)``."""
+    with transaction.atomic():
+        candidates = list(due(now, shard, shards).order_by('next_run', 'id').values_list('pk', 'user_id')[:chunk_size])
+        if not candidates:
+            return 0, 0
+        list(
+            Profile.objects
+            .filter(user_id__in={user_id for _, user_id in candidates})
+            .order_by('user_id')
+            .select_for_update()
+            .values_list('pk', flat=True)
+        )
+        # Still due: another worker may have taken some while we waited.
+        templates = list(
+            due(now, shard, shards)
+            .filter(pk__in=[pk for pk, _ in candidates])
+            .select_for_update(skip_locked=True)
+            .order_by('next_run', 'id')
+        )
+        if not templates:
+            return 0, 0
+        occurrences = [occurrence for template in templates for occurrence in _occurrences(template, now)]
+        if occurrences:
+            # The unique constraint backs this up; skipping known dates up
+            # front keeps a rerun from aborting the whole chunk.
+            existing = set(
+                TransactionDetails.objects
+                .filter(
+                    recurring_source__in=[template.pk for template in templates],
+                    date__gte=min(occurrence.date for occurrence in occurrences),
+                )
+                .values_list('recurring_source_id', 'date')
+            )
+            occurrences = [o for o in occurrences if (o.recurring_source_id, o.date) not in existing]
+        change_seqs = caching.bump_transactions_versions({occurrence.user_id for occurrence in occurrences})
+        for occurrence in occurrences:
+            occurrence.change_seq = change_seqs[occurrence.user_id]
+        created = TransactionDetails.objects.bulk_create(occurrences, batch_size=500)
+        TransactionDetails.objects.bulk_update(templates, ['next_run'], batch_size=500)
+        # bulk_create sends no signals, so feed the rollups directly.
+        rollups.record_many(created)
+    return len(templates), len(created)
+
+
+def materialize(now=None, shard=0, shards=1, chunk_size=CHUNK_SIZE):
+    """Materialize everything due by ``now`` in one user-id shard."""
+    now = now or timezone.now()
+    result = MaterializeResult()
+    started = time.perf_counter()
+    while True:
+        templates, created = materialize_chunk(now, shard, shards, chunk_size)
+        if not templates:
+            break
+        result.templates += templates
+        result.created += created
+        result.chunks += 1
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,75 @@
+import json
+
+import orjson
+from django.http import Http404
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Lets ``?format=csv`` through DRF content negotiation. Exports stream their
+    own body; only error payloads are rendered here, as plain JSON text.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, default=str).encode()
+
+
+class NDJSONRenderer(CSVRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer backed by orjson. Compact output is byte-for-byte
+    what JSONRenderer produces; types orjson doesn't handle the same way
+    (Decimal, datetime, lazy strings, ...) go through DRF's own encoder, and
+    indented output (browsable API) is left to JSONRenderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+class FormatParamNegotiation(DefaultContentNegotiation):
+    """
+    Content negotiation that answers a ``?format=`` naming none of the view's
+    renderers with the view's first renderer instead of a 404, so a view that
+    reads ``format`` itself (the export) can reject it with its own 400.
+    An unknown ``.json``-style URL suffix is still a 404. Only views that
+    opt in with ``@negotiation_class`` use it.
+    """
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except Http404:
+            if format_suffix:
+                raise
+            return renderers[0], renderers[0].media_type
+
+
+def negotiation_class(negotiation_class):
+    """
+    Set an ``@api_view`` view's content negotiation, which DRF has no
+    decorator for. Place it above ``@api_view``.
+    """
+    def decorator(view):
+        view.cls.content_negotiation_class = negotiation_class
+        return view
+    return decorator
@@ -0,0 +1,149 @@
+"""
+Incremental maintenance of the per-user daily ``Statistics`` rollups and of
+each user's ``Profile.total_balance``. Expense writes also refresh any
+already-computed ``TopSpending`` month they fall into (see
+``api.topspending``).
+
+Every write path for TransactionDetails feeds its delta through here: single
+rows via the signal handlers in ``api.signals`` and bulk inserts via
+``record_many``. Rows are adjusted with ``F()`` expressions, so concurrent
+writers never lose an update. Callers should run these inside the same DB
+transaction as the write they describe.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from . import partitioning, topspending
+from .models import Profile, Statistics
+
+# Transaction types that move a rollup column; transfers and refunds don't.
+ROLLUP_FIELDS = {
+    'INCOME': 'total_income',
+    'EXPENSE': 'total_expense',
+}
+# How each rollup column moves the running balance.
+BALANCE_SIGNS = {
+    'total_income': 1,
+    'total_expense': -1,
+}
+
+
+def rollup_date(value):
+    """The calendar day (in the current time zone) a transaction counts towards."""
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def apply_delta(user_id, day, deltas):
+    """
+    Add ``deltas`` (``{'total_income': Decimal, ...}``) to one rollup row.
+
+    Negative deltas only ever adjust an existing row; a missing row means
+    there is nothing to take away (e.g. the user is being deleted).
+    """
+    deltas = {field: amount for field, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    increments = {field: F(field) + amount for field, amount in deltas.items()}
+    rows = Statistics.objects.filter(user_id=user_id, date=day)
+    if rows.update(**increments) or any(amount < 0 for amount in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            Statistics.objects.create(user_id=user_id, date=day, **deltas)
+    except IntegrityError:
+        # Another writer created the row first; add on top of theirs.
+        rows.update(**increments)
+
+
+def apply_balance(user_id, amount):
+    """
+    Add ``amount`` to the user's running balance. Profiles are created with
+    the user (see ``api.signals``), so a missing row means the user is being
+    deleted and there is nothing to keep.
+    """
+    if amount:
+        Profile.objects.filter(user_id=user_id).update(total_balance=F('total_balance') + amount)
+
+
+def record(transaction_type, user_id, date, amount, sign=1):
+    field = ROLLUP_FIELDS.get(transaction_type)
+    if field:
+        delta = sign * Decimal(amount)
+        apply_delta(user_id, rollup_date(date), {field: delta})
+        apply_balance(user_id, BALANCE_SIGNS[field] * delta)
+        if field == 'total_expense':
+            topspending.refresh(user_id, [topspending.period_of(date)])
+
+
+def record_many(transactions, sign=1):
+    """Fold many transactions into one update per (user, day) rollup row."""
+    grouped = defaultdict(lambda: defaultdict(int))
+    balances = defaultdict(int)
+    spent_periods = defaultdict(set)
+    for txn in transactions:
+        field = ROLLUP_FIELDS.get(txn.transaction_type)
+        if field:
+            grouped[(txn.user_id, rollup_date(txn.date))][field] += sign * txn.amount
+            balances[txn.user_id] += BALANCE_SIGNS[field] * sign * txn.amount
+            if field == 'total_expense':
+                spent_periods[txn.user_id].add(topspending.period_of(txn.date))
+    for (user_id, day), deltas in grouped.items():
+        apply_delta(user_id, day, deltas)
+    for user_id, amount in balances.items():
+        apply_balance(user_id, amount)
+    for user_id, periods in spent_periods.items():
+        topspending.refresh(user_id, periods)
+
+
+def archived_balances():
+    """
+    ``{user_id: income - expense}`` over the rows of detached partitions
+    (``api.partitioning.archives``). Those rows left the API but still count
+    towards balances.
+    """
+    balances = defaultdict(Decimal)
+    if connection.vendor != 'postgresql':
+        return balances
+    with connection.cursor() as cursor:
+        for table in partitioning.archives(cursor):
+            cursor.execute(
+                "SELECT user_id, SUM(CASE transaction_type WHEN 'INCOME' THEN amount "
+                "WHEN 'EXPENSE' THEN -amount ELSE 0 END) "
+                f'FROM {connection.ops.quote_name(table)} GROUP BY user_id'
+            )
+            for user_id, amount in cursor.fetchall():
+                balances[user_id] += amount
+    return balances
+
+
+def balance_drift():
+    """
+    Profiles whose ``total_balance`` disagrees with their transactions, as
+    ``{'user_id', 'total_balance', 'actual'}`` rows from one grouped query.
+    Rows in detached archive partitions are counted too.
+    """
+    transactions = 'user__transaction_details'
+    live = (
+        Profile.objects
+        .values('user_id', 'total_balance')
+        .annotate(
+            income=Sum(f'{transactions}__amount', filter=Q(**{f'{transactions}__transaction_type': 'INCOME'}), default=0),
+            expense=Sum(f'{transactions}__amount', filter=Q(**{f'{transactions}__transaction_type': 'EXPENSE'}), default=0),
+        )
+        .annotate(actual=F('income') - F('expense'))
+    )
+    archived = archived_balances()
+    if not archived:
+        return live.exclude(total_balance=F('actual')).values('user_id', 'total_balance', 'actual').order_by()
+    drifted = []
+    for row in live.values('user_id', 'total_balance', 'actual').order_by().iterator(chunk_size=2000):
+        row['actual'] += archived.get(row['user_id'], 0)
+        if row['actual'] != row['total_balance']:
+            drifted.append(row)
+    return drifted
@@ -0,0 +1,60 @@
+"""
+Full-text search over transaction descriptions and categories.
+
+On PostgreSQL, migration 0018 adds ``txn_search_idx``. It is a GIN index on
+``to_tsvector('simple', description || ' ' || category)``, and ``search``
+filters on exactly that expression, so the index serves it. The ``simple``
+configuration skips stemming and stop words because merchant names and notes
+are not in any one language. Every search term matches as a prefix
+("starb" finds "Starbucks"), all terms must match, and results are ranked
+by ``ts_rank`` and then by recency.
+
+Other databases fall back to an unindexed ``icontains`` match of each term
+and return the matches newest first.
+"""
+import re
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Q
+
+CONFIG = 'simple'
+SEARCH_VECTOR = SearchVector('description', 'category', config=CONFIG)
+SEARCH_INDEX = GinIndex(SEARCH_VECTOR, name='txn_search_idx')
+MAX_TERMS = 8
+RANKED_ORDERING = ('-rank', '-date', '-id')
+FALLBACK_ORDERING = ('-date', '-id')
+_TERM = re.compile(r'\w+')
+
+
+def terms(text):
+    """The words of ``text`` to search for, lowercased, at most ``MAX_TERMS``."""
+    return _TERM.findall(text.lower())[:MAX_TERMS]
+
+
+def supports_full_text():
+    return connection.vendor == 'postgresql'
+
+
+def search(queryset, words):
+    """
+    ``(queryset, ordering)`` for the rows of ``queryset`` that match every
+    one of ``words``. ``ordering`` is unique and, when ranked, includes the
+    ``rank`` annotation, ready for ``paginate_keyset``.
+    """
+    if not supports_full_text():
+        condition = Q()
+        for word in words:
+            condition &= Q(description__icontains=word) | Q(category__icontains=word)
+        return queryset.filter(condition), FALLBACK_ORDERING
+
+    # Terms are \w+ only, so quoting them makes a safe raw tsquery.
+    query = SearchQuery(' & '.join(f"'{word}':*" for word in words), config=CONFIG, search_type='raw')
+    ranked = (
+        queryset
+        .alias(document=SEARCH_VECTOR)
+        .filter(document=query)
+        .annotate(rank=SearchRank(SEARCH_VECTOR, query))
+    )
+    return ranked, RANKED_ORDERING
@@ -1,3 +1,6 @@
+from decimal import Decimal
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Item, UserDetails, TransactionDetails
 
@@ -28,4 +31,86 @@ class TransactionDetailsSerializer(serializers.ModelSerializer):
             'category': {'required': False, 'allow_null': True},
             'is_recurring': {'required': False, 'default': False},
             'recurring_frequency': {'required': False, 'allow_null': True}
-        } 
\ No newline at end of file
+        }
+
+class TransactionInputSerializer(TransactionDetailsSerializer):
+    """
+    Validates a transaction submitted by an authenticated user. The owner
+    comes from the request token, so ``user`` is read-only here and no user
+    lookup is made during validation; pass it to ``save(user=...)``.
+    """
+    class Meta(TransactionDetailsSerializer.Meta):
+        read_only_fields = ['id', 'user', 'date']
+
+
+def _decimal_to_string(places):
+    exponent = Decimal(1).scaleb(-places)
+    def convert(value):
+        return None if value is None else '{:f}'.format(value.quantize(exponent))
+    return convert
+
+
+def _datetime_to_string(value):
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer over ``QuerySet.values()`` rows for list endpoints.
+
+    Emits exactly what the corresponding ModelSerializer would for the plain
+    column types used here, but the per-field converters are resolved once
+    per class instead of building DRF field objects for every row.
+    """
+    model = None
+    fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        converters = []
+        for name in cls.fields:
+            field = cls.model._meta.get_field(name)
+            if isinstance(field, models.DecimalField):
+                converters.append((name, _decimal_to_string(field.decimal_places)))
+            elif isinstance(field, models.DateTimeField):
+                converters.append((name, _datetime_to_string))
+            else:
+                converters.append((name, None))
+        cls._converters = tuple(converters)
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.fields)
+
+    @classmethod
+    def to_representation(cls, row):
+        return {
+            name: convert(row[name]) if convert else row[name]
+            for name, convert in cls._converters
+        }
+
+    @classmethod
+    def many(cls, rows):
+        return [cls.to_representation(row) for row in rows]
+
+
+class TransactionDetailsReadSerializer(ValuesSerializer):
+    model = TransactionDetails
+    fields = TransactionDetailsSerializer.Meta.fields
+
+
+class TransactionSyncSerializer(ValuesSerializer):
+    model = TransactionDetails
+    fields = [*TransactionDetailsSerializer.Meta.fields, 'updated_at']
+
+
+class UserDetailsReadSerializer(ValuesSerializer):
+    model = UserDetails
+    # UserDetailsSerializer's fields minus the write-only password and the
+    # token: these rows are cached and served to anyone.
+    fields = ['user_id', 'name', 'phone_number', 'profile_img', 'age', 'bank_account_name']
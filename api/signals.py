@@ -0,0 +1,92 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, recurring, rollups
+from .authentication import token_cache
+from .models import Profile, UserDetails, TransactionDetails, TransactionTombstone
+
+
+@receiver(post_save, sender=UserDetails)
+@receiver(post_delete, sender=UserDetails)
+def evict_cached_token(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=UserDetails)
+@receiver(post_delete, sender=UserDetails)
+def invalidate_cached_user_pages(sender, instance, created=True, **kwargs):
+    # post_delete sends no ``created``; a delete changes the count too.
+    caching.invalidate_users(count_changed=created)
+
+
+@receiver(post_delete, sender=UserDetails)
+def drop_tombstones(sender, instance, **kwargs):
+    # Nobody is left to sync them; see rollup_deleted_transaction.
+    TransactionTombstone.objects.filter(user_id=instance.user_id).delete()
+
+
+def _deleting_users(origin):
+    """Whether a delete started from UserDetails rows (and so cascades to their transactions)."""
+    if isinstance(origin, QuerySet):
+        return origin.model is UserDetails
+    return isinstance(origin, UserDetails)
+
+
+@receiver(post_save, sender=UserDetails)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    # The running balance is only ever adjusted in place (see api.rollups).
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+
+
+# Single-row writes keep the daily rollups, the running balance and the
+# per-user transactions version current here. bulk_create and
+# QuerySet.update() bypass signals; those paths call api.rollups and
+# api.caching directly.
+
+@receiver(pre_save, sender=TransactionDetails)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).values(
+            'transaction_type', 'user_id', 'date', 'amount'
+        ).first()
+
+
+@receiver(pre_save, sender=TransactionDetails)
+def schedule_recurring_transaction(sender, instance, raw=False, **kwargs):
+    if not raw:
+        recurring.schedule(instance)
+
+
+@receiver(pre_save, sender=TransactionDetails)
+def stamp_change_seq(sender, instance, raw=False, **kwargs):
+    # TransactionDetails.save() runs this in the row's DB transaction.
+    if not raw:
+        instance.change_seq = caching.bump_transactions_version(instance.user_id)
+
+
+@receiver(post_save, sender=TransactionDetails)
+def rollup_saved_transaction(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        rollups.record(sign=-1, **previous)
+        if previous['user_id'] != instance.user_id:
+            caching.bump_transactions_version(previous['user_id'])
+    rollups.record(instance.transaction_type, instance.user_id, instance.date, instance.amount)
+
+
+@receiver(post_delete, sender=TransactionDetails)
+def rollup_deleted_transaction(sender, instance, origin=None, **kwargs):
+    # A deleted user's rollups and profile go with it, and nobody is left
+    # to sync the tombstones, so a cascade skips the per-row work.
+    if _deleting_users(origin):
+        return
+    rollups.record(instance.transaction_type, instance.user_id, instance.date, instance.amount, sign=-1)
+    TransactionTombstone.objects.create(
+        user_id=instance.user_id, transaction_id=instance.pk,
+        change_seq=caching.bump_transactions_version(instance.user_id),
+    )
@@ -0,0 +1,82 @@
+"""
+Date drill-down for the TransactionDetails admin changelist.
+
+Django's ``date_hierarchy`` finds the years to offer, and then a year's
+months, with a ``SELECT DISTINCT`` over every row they cover. On the
+partitioned transactions table, ``partition_date_hierarchy`` takes those
+choices from the partitions instead (``partitioning.populated_months``).
+Partitions are UTC months, and so is TIME_ZONE. The choices ignore list
+filters, so a year can be offered with no rows of the filtered type.
+Django's own tag takes over once a month is picked, since that range lies
+within one partition. It also does when the list is searched, because one
+user's rows are read through that user's indexes, and when the table is
+not partitioned.
+"""
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.db import connections
+from django.template import Library
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from api import partitioning
+
+register = Library()
+
+
+def _populated_months(cl):
+    """The months holding rows, or None when Django's own queries should run."""
+    connection = connections[cl.queryset.db]
+    if cl.query or connection.vendor != 'postgresql':
+        return None
+    table = cl.model._meta.db_table
+    with connection.cursor() as cursor:
+        if not partitioning.is_partitioned(cursor, table):
+            return None
+        return partitioning.populated_months(cursor, table)
+
+
+def partition_date_hierarchy(cl):
+    field_name = cl.date_hierarchy
+    year_field, month_field = f'{field_name}__year', f'{field_name}__month'
+    if month_field in cl.params:
+        return date_hierarchy(cl)
+    months = _populated_months(cl)
+    if not months or len(months) == 1:
+        # Nothing to list, or Django drills straight into the one month.
+        return date_hierarchy(cl)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    years = sorted({month.year for month in months})
+    year = cl.params.get(year_field) or (str(years[0]) if len(years) == 1 else None)
+    if year is None:
+        return {
+            'show': True,
+            'back': None,
+            'choices': [{'link': link({year_field: str(y)}), 'title': str(y)} for y in years],
+        }
+    return {
+        'show': True,
+        'back': {'link': link({}), 'title': _('All dates')},
+        'choices': [
+            {
+                'link': link({year_field: year, month_field: month.month}),
+                'title': capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+            }
+            for month in months if str(month.year) == year
+        ],
+    }
+
+
+@register.tag(name='partition_date_hierarchy')
+def partition_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=partition_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
@@ -1,3 +1,1356 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import combinations
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.contrib.admin import site
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction as db_transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .admin import EstimatedCountPaginator, UserDetailsAdmin
+from . import analytics, caching, db_router, hashing, idempotency, metrics, partitioning, recurring, search, topspending, writebehind
+from .authentication import token_cache
+from .models import IdempotencyKey, Profile, UserDetails, TransactionDetails, Statistics, TopSpending, TransactionTombstone
+from .pagination import encode_cursor
+from .renderers import ORJSONRenderer
+from .serializers import (
+    TransactionDetailsSerializer, TransactionDetailsReadSerializer,
+    UserDetailsSerializer, UserDetailsReadSerializer
+)
+from .views import TRANSACTION_ORDERING, _transaction_filters
 
 # Create your tests here.
+
+
+def make_user(**kwargs):
+    defaults = {
+        'name': 'Test User',
+        'phone_number': '+919876543210',
+        'age': 30,
+        'bank_account_name': 'Test Savings',
+        'password': 'SecurePass123!',
+    }
+    defaults.update(kwargs)
+    return UserDetails.objects.create(**defaults)
+
+
+class ListTransactionsPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        TransactionDetails.objects.bulk_create([
+            TransactionDetails(user=self.user, amount=Decimal('1.00') + i, transaction_type='EXPENSE')
+            for i in range(7)
+        ])
+
+    def test_follows_next_cursor_to_the_end(self):
+        url = reverse('list-transactions')
+        seen = []
+        response = self.client.get(url, {'page_size': 3})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['data'])
+            if not response.data['next']:
+                break
+            response = self.client.get(url, {'page_size': 3, 'cursor': response.data['next']})
+
+        expected = list(
+            TransactionDetails.objects.filter(user=self.user)
+            .order_by('-date', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_rejects_garbage_cursor(self):
+        response = self.client.get(reverse('list-transactions'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['status'], 'error')
+
+    def test_rejects_forged_cursors(self):
+        for values in ([123, 1], [None, None], ['2024-01-01T00:00:00+00:00', 'x'], [[], {}]):
+            response = self.client.get(reverse('list-transactions'), {'cursor': encode_cursor(values)})
+            self.assertEqual(response.status_code, 400, values)
+
+    def test_total_transactions_counts_every_match(self):
+        data = self.client.get(reverse('list-transactions'), {'page_size': 3}).data
+        self.assertEqual(data['total_transactions'], 7)
+        self.assertEqual(data['count'], 3)
+        data = self.client.get(reverse('list-transactions'), {'page_size': 3, 'cursor': data['next']}).data
+        self.assertEqual(data['total_transactions'], 7)
+
+        TransactionDetails.objects.create(user=self.user, amount=Decimal('1.00'), transaction_type='INCOME')
+        self.assertEqual(self.client.get(reverse('list-transactions')).data['total_transactions'], 8)
+        data = self.client.get(reverse('list-transactions'), {'type': 'INCOME'}).data
+        self.assertEqual(data['total_transactions'], 1)
+
+
+class ListTransactionsFilterTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        day = timezone.make_aware(datetime(2024, 3, 10, 12))
+        rows = [
+            ('EXPENSE', 'Food', '12.50', day),
+            ('EXPENSE', 'Rent', '900.00', day - timedelta(days=9)),
+            ('INCOME', 'Salary', '3000.00', day - timedelta(days=10)),
+            ('EXPENSE', 'Food', '4.00', day + timedelta(days=1)),
+        ]
+        self.ids = [
+            TransactionDetails.objects.create(user=self.user, transaction_type=kind, category=category,
+                                              amount=Decimal(amount), date=when).id
+            for kind, category, amount, when in rows
+        ]
+
+    def ids_for(self, **params):
+        response = self.client.get(reverse('list-transactions'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['data']]
+
+    def test_filters_combine(self):
+        food, rent, salary, later_food = self.ids
+        self.assertEqual(self.ids_for(**{'from': '2024-03-01', 'to': '2024-03-10'}), [food, rent])
+        self.assertEqual(self.ids_for(type='income'), [salary])
+        self.assertEqual(self.ids_for(category='Food'), [later_food, food])
+        self.assertEqual(self.ids_for(min_amount='4.00', max_amount='12.50'), [later_food, food])
+        self.assertEqual(self.ids_for(category='Food', min_amount='5', to='2024-03-10'), [food])
+
+    def test_date_range_reaches_the_last_representable_day(self):
+        food, rent, salary, later_food = self.ids
+        self.assertEqual(self.ids_for(**{'from': '2024-03-10', 'to': '9999-12-31'}), [later_food, food])
+        self.assertEqual(self.ids_for(**{'from': '0001-01-01', 'to': '2024-03-01'}), [rent, salary])
+
+    def test_rejects_invalid_filters(self):
+        for params in ({'from': '10/03/2024'}, {'from': '2024-03-10', 'to': '2024-03-01'},
+                       {'type': 'GIFT'}, {'min_amount': 'ten'}, {'max_amount': 'NaN'},
+                       {'min_amount': '-1'}, {'min_amount': '5', 'max_amount': '1'}):
+            response = self.client.get(reverse('list-transactions'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.data['status'], 'error')
+
+
+class CreateTransactionsBatchTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def test_inserts_valid_rows_and_reports_invalid_ones(self):
+        response = self.client.post(reverse('create-transactions-batch'), {
+            'transactions': [
+                {'amount': '12.50', 'transaction_type': 'EXPENSE', 'category': 'Food'},
+                {'amount': '-1', 'transaction_type': 'EXPENSE'},
+                {'amount': '2000.00', 'transaction_type': 'INCOME'},
+            ]
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1])
+        self.assertIn('amount', response.data['errors'][0]['errors'])
+        self.assertEqual([row['index'] for row in response.data['data']], [0, 2])
+        self.assertEqual(TransactionDetails.objects.filter(user=self.user).count(), 2)
+
+    def test_rejects_batch_without_valid_rows(self):
+        response = self.client.post(reverse('create-transactions-batch'), {
+            'transactions': [{'transaction_type': 'BOGUS'}]
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TransactionDetails.objects.exists())
+
+
+class TokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+
+    def test_repeat_requests_skip_the_user_lookup(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        self.client.get(reverse('list-transactions'))
+        # Only the ETag version and the page query remain once the token is cached.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('list-transactions'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_rotated_token_is_evicted_on_save(self):
+        old_token = self.user.token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {old_token}')
+        self.assertEqual(self.client.get(reverse('list-transactions')).status_code, 200)
+
+        self.user.token = None
+        self.user.save()
+
+        response = self.client.get(reverse('list-transactions'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['message'], 'Invalid token or user not found')
+
+    def test_missing_header_is_unauthorized(self):
+        response = self.client.get(reverse('list-transactions'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['status'], 'error')
+
+    def test_app_token_cannot_use_admin_viewsets(self):
+        other = make_user(phone_number='+919876543211')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        self.assertIn(self.client.get(reverse('userdetails-list')).status_code, (401, 403))
+        response = self.client.delete(reverse('userdetails-detail', args=[other.user_id]))
+        self.assertIn(response.status_code, (401, 403))
+        self.assertTrue(UserDetails.objects.filter(pk=other.pk).exists())
+
+    def test_staff_session_can_use_admin_viewsets(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'AdminPass123!'))
+        self.assertEqual(self.client.get(reverse('userdetails-list')).status_code, 200)
+
+    def test_stale_token_does_not_block_signup(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token no-longer-valid')
+        response = self.client.post(reverse('create-user'), {
+            'name': 'New User', 'phone_number': '+919876543212', 'age': 25,
+            'bank_account_name': 'Savings', 'password': 'SecurePass123!',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are PostgreSQL specific')
+class TransactionIndexPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [make_user(name=f'User {i}') for i in range(20)]
+        now = timezone.now()
+        TransactionDetails.objects.bulk_create([
+            TransactionDetails(
+                user=user, amount=Decimal('1.00') + i % 50,
+                transaction_type='INCOME' if i % 10 == 0 else 'EXPENSE',
+                category=('Food', 'Transport', 'Rent', 'Fun')[i % 4],
+                date=now - timedelta(hours=i * 5)
+            )
+            for user in users for i in range(500)
+        ], batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE api_transactiondetails')
+        cls.user = users[0]
+
+    def assertIndexScanWithoutSort(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        # A Sort node, not the "Sort Key" of a Merge Append over partitions.
+        self.assertNotIn('Sort  (', plan)
+
+    def test_list_page_uses_composite_index(self):
+        queryset = TransactionDetails.objects.filter(user=self.user).order_by(*TRANSACTION_ORDERING)
+        self.assertIndexScanWithoutSort(queryset[:51], 'txn_user_date_id_idx')
+
+    def test_category_report_uses_category_index(self):
+        queryset = TransactionDetails.objects.filter(user=self.user, category='Food').order_by('date')
+        self.assertIn('txn_user_category_date_idx', queryset.explain())
+
+    def test_every_list_filter_combination_uses_an_index(self):
+        params = {
+            'from': (timezone.localdate() - timedelta(days=30)).isoformat(),
+            'to': timezone.localdate().isoformat(),
+            'type': 'INCOME',
+            'category': 'Food',
+            'min_amount': '10',
+            'max_amount': '20',
+        }
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT DISTINCT tableoid::regclass::text FROM api_transactiondetails')
+            tables = [table for (table,) in cursor.fetchall()]
+        factory = APIRequestFactory()
+        for size in range(len(params) + 1):
+            for names in combinations(params, size):
+                request = Request(factory.get('/', {name: params[name] for name in names}))
+                queryset = (
+                    TransactionDetails.objects.filter(user=self.user, **_transaction_filters(request))
+                    .order_by(*TRANSACTION_ORDERING)[:51]
+                )
+                plan = queryset.explain()
+                self.assertIn('txn_user_', plan, names)
+                for table in tables:
+                    self.assertNotIn(f'Seq Scan on {table} ', plan, names)
+
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search is PostgreSQL-only')
+    def test_search_uses_full_text_index(self):
+        TransactionDetails.objects.create(user=self.user, amount=Decimal('9.00'), transaction_type='EXPENSE',
+                                          description='Zanzibar Spice Market')
+        queryset, ordering = search.search(TransactionDetails.objects.filter(user=self.user), ['zanzib'])
+        self.assertIn('txn_search_idx', queryset.order_by(*ordering)[:51].explain())
+
+    def test_admin_changelist_page_uses_date_index(self):
+        self.assertIndexScanWithoutSort(TransactionDetails.objects.order_by('-date', '-id')[:100], 'txn_date_id_idx')
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def totals(self):
+        return list(Statistics.objects.filter(user=self.user).values_list('total_income', 'total_expense'))
+
+    def test_every_write_path_keeps_rollups_current(self):
+        self.client.post(reverse('create-transaction'), {'amount': '100.00', 'transaction_type': 'INCOME'}, format='json')
+        self.client.post(reverse('create-transactions-batch'), [
+            {'amount': '30.00', 'transaction_type': 'EXPENSE'},
+            {'amount': '20.00', 'transaction_type': 'EXPENSE'},
+            {'amount': '5.00', 'transaction_type': 'TRANSFER'},
+        ], format='json')
+        self.assertEqual(self.totals(), [(Decimal('100.00'), Decimal('50.00'))])
+
+        txn = TransactionDetails.objects.get(user=self.user, amount=Decimal('30.00'))
+        txn.transaction_type = 'INCOME'
+        txn.save()
+        self.assertEqual(self.totals(), [(Decimal('130.00'), Decimal('20.00'))])
+
+        txn.delete()
+        self.assertEqual(self.totals(), [(Decimal('100.00'), Decimal('20.00'))])
+
+    def test_summary_groups_rollups_by_period(self):
+        Statistics.objects.create(user=self.user, date=date(2025, 7, 2), total_income=Decimal('10.00'), total_expense=Decimal('4.00'))
+        Statistics.objects.create(user=self.user, date=date(2025, 7, 1), total_expense=Decimal('6.00'))
+        Statistics.objects.create(user=self.user, date=date(2025, 6, 30), total_income=Decimal('1.00'))
+
+        response = self.client.get(reverse('transaction-summary'), {
+            'period': 'monthly', 'from': '2025-07-01', 'to': '2025-07-31'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'], [{
+            'period': '2025-07-01', 'total_income': '10.00', 'total_expense': '10.00', 'net': '0.00'
+        }])
+
+    def test_summary_rejects_unknown_period(self):
+        response = self.client.get(reverse('transaction-summary'), {'period': 'hourly'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTransactionsTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        TransactionDetails.objects.bulk_create([
+            TransactionDetails(user=self.user, amount=Decimal('9.99'), transaction_type='EXPENSE', category='Food, drinks'),
+            TransactionDetails(user=self.user, amount=Decimal('1500.00'), transaction_type='INCOME'),
+        ])
+
+    def export(self, **params):
+        response = self.client.get(reverse('export-transactions'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        lines = self.export(format='csv').splitlines()
+        self.assertEqual(lines[0], 'id,date,amount,transaction_type,category,description,is_recurring,recurring_frequency')
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"Food, drinks"', lines[2])
+
+    def test_ndjson_export(self):
+        rows = [json.loads(line) for line in self.export(format='ndjson').splitlines()]
+        self.assertEqual([row['amount'] for row in rows], ['1500.00', '9.99'])
+
+    def test_date_range_excludes_other_days(self):
+        self.assertEqual(self.export(format='ndjson', to='2000-01-01'), '')
+        self.assertEqual(len(self.export(format='ndjson', to='9999-12-31').splitlines()), 2)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('export-transactions'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'format must be one of: csv, ndjson')
+
+    def test_other_views_keep_drf_format_negotiation(self):
+        response = self.client.get(reverse('list-transactions'), {'format': 'csv'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ImportTransactionsTests(TestCase):
+    CSV = (
+        'date,amount,transaction_type,description,category\n'
+        '2024-01-05 09:30:00,45.10,expense,Groceries,Food\n'
+        '2024-01-05,not-a-number,EXPENSE,,\n'
+        '2024-01-31,3000.00,INCOME,January salary,Salary\n'
+        '2024-02-30,10.00,EXPENSE,Bad date,\n'
+    )
+
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def test_upload_loads_valid_lines_and_reports_rejects(self):
+        upload = SimpleUploadedFile('statement.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('import-transactions'), {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual([e['line'] for e in response.data['errors']], [3, 5])
+        rows = TransactionDetails.objects.filter(user=self.user).order_by('date')
+        self.assertEqual([(r.date.date(), r.amount, r.category) for r in rows], [
+            (date(2024, 1, 5), Decimal('45.10'), 'Food'),
+            (date(2024, 1, 31), Decimal('3000.00'), 'Salary'),
+        ])
+        self.assertIsNone(TransactionDetails.objects.get(category='Food').recurring_frequency)
+        self.assertEqual(Statistics.objects.get(user=self.user, date=date(2024, 1, 31)).total_income, Decimal('3000.00'))
+
+    def test_command_reports_throughput(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.CSV)
+        self.addCleanup(os.unlink, f.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_transactions', self.user.user_id, f.name, stdout=out, stderr=err)
+
+        self.assertIn('Imported 2 rows', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertIn('line 3:', err.getvalue())
+
+    def test_missing_columns_rejects_whole_file(self):
+        upload = SimpleUploadedFile('statement.csv', b'when,how much\n2024-01-01,5\n', content_type='text/csv')
+        response = self.client.post(reverse('import-transactions'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+    UNREADABLE = {
+        'not UTF-8': (CSV.encode() + '2024-03-01,5.00,EXPENSE,Caf\xe9,\n'.encode('latin-1'), 'not UTF-8'),
+        'oversized field': (CSV.encode() + b'2024-03-01,"' + b'x' * 200_000 + b'"\n', 'malformed CSV at line'),
+    }
+
+    def test_unreadable_file_is_rejected_by_upload(self):
+        for name, (content, message) in self.UNREADABLE.items():
+            upload = SimpleUploadedFile('statement.csv', content, content_type='text/csv')
+            response = self.client.post(reverse('import-transactions'), {'file': upload}, format='multipart')
+            self.assertEqual(response.status_code, 400, name)
+            self.assertIn(message, response.data['message'])
+        self.assertFalse(TransactionDetails.objects.exists())
+
+    def test_unreadable_file_is_rejected_by_command(self):
+        for name, (content, message) in self.UNREADABLE.items():
+            with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as f:
+                f.write(content)
+            self.addCleanup(os.unlink, f.name)
+            with self.assertRaisesMessage(CommandError, message):
+                call_command('import_transactions', self.user.user_id, f.name, stdout=io.StringIO())
+        self.assertFalse(TransactionDetails.objects.exists())
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        rows = [
+            ('2025-01-10', '120.00', 'EXPENSE', 'Food'),
+            ('2025-01-15', '3000.00', 'INCOME', 'Salary'),
+            ('2025-02-03', '80.50', 'EXPENSE', 'Food'),
+            ('2025-02-20', '900.00', 'EXPENSE', 'Rent'),
+            ('2025-03-01', '15.25', 'EXPENSE', None),
+            ('2025-03-02', '40.00', 'TRANSFER', 'Savings'),
+        ]
+        TransactionDetails.objects.bulk_create([
+            TransactionDetails(
+                user=self.user, amount=Decimal(amount), transaction_type=kind, category=category,
+                date=timezone.make_aware(datetime.fromisoformat(day))
+            )
+            for day, amount, kind, category in rows
+        ])
+
+    def test_vectorized_matches_reference(self):
+        args = (self.user, date(2024, 12, 1), date(2025, 3, 31))
+        self.assertEqual(analytics.compute(*args), analytics.compute_naive(*args))
+
+    def test_endpoint_breakdown(self):
+        response = self.client.get(reverse('transaction-analytics'), {'from': '2025-01-01', 'to': '2025-03-31'})
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual([c['category'] for c in data['categories']], ['Rent', 'Food', 'Uncategorized'])
+        self.assertEqual(data['categories'][1]['total'], 200.5)
+        self.assertEqual([m['month'] for m in data['monthly']], ['2025-01', '2025-02', '2025-03'])
+        self.assertEqual([m['expense'] for m in data['monthly']], [120.0, 980.5, 15.25])
+        self.assertEqual(data['monthly'][1]['expense_rolling_mean'], 550.25)
+        self.assertEqual(data['percentiles']['p50'], 100.25)
+
+    def test_range_can_end_on_the_last_representable_day(self):
+        response = self.client.get(reverse('transaction-analytics'), {'from': '9999-12-01', 'to': '9999-12-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['month'] for m in response.data['data']['monthly']], ['9999-12'])
+        args = (self.user, date(2025, 2, 1), date.max)
+        self.assertEqual(analytics.compute(*args)['categories'][0]['category'], 'Rent')
+        self.assertEqual(analytics.compute(*args), analytics.compute_naive(*args))
+
+
+class FastReadPathTests(TestCase):
+    def setUp(self):
+        self.user = make_user(name='Zoë', profile_img='https://example.com/a.png')
+        make_user(name='Ánna')
+        TransactionDetails.objects.bulk_create([
+            TransactionDetails(user=self.user, amount=Decimal('7'), transaction_type='EXPENSE',
+                               description='Caf\u00e9\u2028line', category=None),
+            TransactionDetails(user=self.user, amount=Decimal('1234.5'), transaction_type='INCOME',
+                               is_recurring=True, recurring_frequency='monthly'),
+        ])
+
+    def assertSameBytes(self, model_data, fast_data):
+        self.assertEqual(JSONRenderer().render(model_data), ORJSONRenderer().render(fast_data))
+
+    def test_transactions_render_like_model_serializer(self):
+        queryset = TransactionDetails.objects.order_by('-date', '-id')
+        self.assertSameBytes(
+            {'data': TransactionDetailsSerializer(queryset, many=True).data},
+            {'data': TransactionDetailsReadSerializer.many(TransactionDetailsReadSerializer.values(queryset))},
+        )
+
+    def test_users_render_like_model_serializer(self):
+        queryset = UserDetails.objects.order_by('name')
+        self.assertSameBytes(
+            {'data': [
+                {key: value for key, value in user.items() if key != 'token'}
+                for user in UserDetailsSerializer(queryset, many=True).data
+            ]},
+            {'data': UserDetailsReadSerializer.many(UserDetailsReadSerializer.values(queryset))},
+        )
+
+    def test_bench_output_is_byte_identical(self):
+        # Seeded rows cover every field shape; the command raises if the installed orjson renders them differently.
+        out = io.StringIO()
+        call_command('bench_serializers', rows=200, repeat=1, stdout=out)
+        self.assertIn('Byte-identical output', out.getvalue())
+
+
+class GetAllUsersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for name in ('Carol', 'alice', 'Bob', 'Dave', 'Bob'):
+            make_user(name=name)
+
+    def test_pages_cover_every_user_in_name_order(self):
+        url = reverse('get-all-users')
+        response = self.client.get(url, {'page_size': 2})
+        names = [u['name'] for u in response.data['data']]
+        while response.data['next']:
+            response = self.client.get(url, {'page_size': 2, 'cursor': response.data['next']})
+            names.extend(u['name'] for u in response.data['data'])
+
+        self.assertEqual(names, list(UserDetails.objects.order_by('name', 'user_id').values_list('name', flat=True)))
+        self.assertEqual(response.data['total_users'], 5)
+        self.assertNotIn('password', response.data['data'][0])
+        self.assertNotIn('token', response.data['data'][0])
+
+    def test_repeat_page_is_cached_until_users_change(self):
+        url = reverse('get-all-users')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_user(name='Eve')
+        response = self.client.get(url)
+        self.assertEqual(response.data['total_users'], 6)
+        self.assertIn('Eve', [u['name'] for u in response.data['data']])
+
+    def test_page_read_before_commit_is_not_cached_as_current(self):
+        url = reverse('get-all-users')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_user(name='Eve')
+            # Another request between the write and its commit sees the old page.
+            self.assertEqual(self.client.get(url).data['total_users'], 5)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(url).data['total_users'], 6)
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 1000
+
+
+class AsyncPasswordViewTests(TestCase):
+    async def login(self, password='SecurePass123!'):
+        return await self.async_client.post(reverse('login-user-async'), {
+            'phone_number': '+919876543210', 'password': password
+        }, content_type='application/json')
+
+    async def test_create_then_login(self):
+        response = await self.async_client.post(reverse('create-user-async'), {
+            'name': 'Async User', 'phone_number': '+919876543210', 'age': 41,
+            'bank_account_name': 'Async Savings', 'password': 'SecurePass123!'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        user = await UserDetails.objects.aget(user_id=response.json()['data']['user_id'])
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        self.assertEqual((await self.login()).status_code, 200)
+        self.assertEqual((await self.login('wrong')).status_code, 401)
+
+    async def test_outdated_hash_is_upgraded_on_login(self):
+        user = await sync_to_async(make_user)()
+        with self.settings(PASSWORD_HASHERS=['api.tests.FastPBKDF2PasswordHasher']):
+            self.assertEqual((await self.login()).status_code, 200)
+        await user.arefresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+    async def test_saturated_pool_sheds_load(self):
+        await sync_to_async(make_user)()
+        with mock.patch.object(hashing, 'POOL_SIZE', 0), mock.patch.object(hashing, 'QUEUE_SIZE', 0):
+            response = await self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    async def test_non_object_json_body_is_rejected(self):
+        for name in ('create-user-async', 'login-user-async'):
+            for body in ('[]', '"+919876543210"', 'null'):
+                response = await self.async_client.post(reverse(name), body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def test_unchanged_list_is_not_modified_with_one_lookup(self):
+        url = reverse('list-transactions')
+        etag = self.client.get(url)['ETag']
+
+        # Only the profile's version; the transaction table is not read.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_changes_etag_after_commit(self):
+        url = reverse('transaction-summary')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create-transaction'), {'amount': '5.00', 'transaction_type': 'EXPENSE'}, format='json')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['data'][0]['total_expense'], '5.00')
+
+    def test_version_is_shared_through_the_database(self):
+        url = reverse('list-transactions')
+        etag = self.client.get(url)['ETag']
+        cache.clear()  # as seen from another worker's empty cache
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        caching.bump_transactions_version(self.user.user_id)
+        cache.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_query(self):
+        url = reverse('list-transactions')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, {'page_size': 5}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SyncTransactionsTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get(reverse('sync-transactions'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pages_upserts_and_reports_deletes(self):
+        kept, edited, removed = [
+            TransactionDetails.objects.create(user=self.user, amount=Decimal(n), transaction_type='EXPENSE')
+            for n in (1, 2, 3)
+        ]
+        first = self.sync(page_size=2)
+        self.assertTrue(first['has_more'])
+        second = self.sync(first['next'], page_size=2)
+        self.assertFalse(second['has_more'])
+        ids = [row['id'] for row in first['data']['upserted'] + second['data']['upserted']]
+        self.assertEqual(ids, [kept.id, edited.id, removed.id])
+
+        self.assertEqual(self.sync(second['next'])['data'], {'upserted': [], 'deleted': []})
+
+        edited.amount = Decimal('20.00')
+        edited.save()
+        removed_id = removed.id
+        removed.delete()
+        changes = self.sync(second['next'])['data']
+        self.assertEqual([(row['id'], row['amount']) for row in changes['upserted']], [(edited.id, '20.00')])
+        self.assertEqual(changes['deleted'], [removed_id])
+
+    def test_rejects_bad_and_expired_cursors(self):
+        response = self.client.get(reverse('sync-transactions'), {'since': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+        for forged in ([None, None, None], [1, 0, '2024-01-01T00:00:00'], [1, 0, 5], [1]):
+            response = self.client.get(reverse('sync-transactions'), {'since': encode_cursor(forged)})
+            self.assertEqual(response.status_code, 400, forged)
+
+        stale = encode_cursor([0, 0, timezone.make_aware(datetime(2000, 1, 1)).isoformat()])
+        response = self.client.get(reverse('sync-transactions'), {'since': stale})
+        self.assertEqual(response.status_code, 410)
+
+        # An (updated_at, id) cursor from before change sequences.
+        legacy = encode_cursor([timezone.now().isoformat(), 0])
+        response = self.client.get(reverse('sync-transactions'), {'since': legacy})
+        self.assertEqual(response.status_code, 410)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent transactions')
+class SyncCommitOrderTests(TransactionTestCase):
+    def test_late_commit_is_not_skipped(self):
+        user = make_user()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {user.token}')
+        TransactionDetails.objects.create(user=user, amount=Decimal('1.00'), transaction_type='EXPENSE')
+
+        started, release = threading.Event(), threading.Event()
+
+        def slow_write():
+            try:
+                with db_transaction.atomic():
+                    TransactionDetails.objects.create(user=user, amount=Decimal('2.00'), transaction_type='EXPENSE')
+                    started.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=slow_write)
+        writer.start()
+        started.wait(5)
+        first = client.get(reverse('sync-transactions')).data
+        release.set()
+        writer.join()
+
+        self.assertEqual([row['amount'] for row in first['data']['upserted']], ['1.00'])
+        later = client.get(reverse('sync-transactions'), {'since': first['next']}).data
+        self.assertEqual([row['amount'] for row in later['data']['upserted']], ['2.00'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent transactions')
+class RecurringLockOrderTests(TransactionTestCase):
+    def test_materializer_waits_for_an_edit_in_progress(self):
+        user = make_user()
+        template = TransactionDetails.objects.create(
+            user=user, amount=Decimal('10.00'), transaction_type='EXPENSE', is_recurring=True,
+            recurring_frequency='weekly', date=timezone.make_aware(datetime(2024, 1, 1)),
+        )
+        errors, results = [], []
+
+        def materialize():
+            try:
+                results.append(recurring.materialize_chunk(timezone.make_aware(datetime(2024, 1, 10))))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with db_transaction.atomic():
+            # An edit locks the owner's Profile first, then the template row.
+            caching.bump_transactions_version(user.user_id)
+            worker = threading.Thread(target=materialize)
+            worker.start()
+            worker.join(0.5)  # let the chunk reach its locks
+            template.description = 'Edited'
+            template.save()
+        worker.join(10)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [(1, 1)])
+        self.assertEqual(TransactionDetails.objects.get(pk=template.pk).description, 'Edited')
+
+
+class RecurringMaterializationTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def make_template(self, frequency, start):
+        template = TransactionDetails.objects.create(
+            user=self.user, amount=Decimal('10.00'), transaction_type='EXPENSE',
+            is_recurring=True, recurring_frequency=frequency, date=start
+        )
+        self.assertIsNotNone(template.next_run)
+        return template
+
+    def test_monthly_occurrences_keep_their_day(self):
+        start = timezone.make_aware(datetime(2024, 1, 31, 9))
+        self.assertEqual(recurring.occurrence_after(start, 'monthly', start),
+                         timezone.make_aware(datetime(2024, 2, 29, 9)))
+        self.assertEqual(recurring.occurrence_after(start, 'Monthly', timezone.make_aware(datetime(2024, 2, 29, 9))),
+                         timezone.make_aware(datetime(2024, 3, 31, 9)))
+
+    def test_materialize_is_idempotent(self):
+        template = self.make_template('weekly', timezone.make_aware(datetime(2024, 1, 1)))
+        now = timezone.make_aware(datetime(2024, 1, 30))
+
+        result = recurring.materialize(now)
+        self.assertEqual(result.created, 4)
+        self.assertEqual(recurring.materialize(now).created, 0)
+
+        # A stale next_run (e.g. a crash before it was saved) is not doubled up.
+        TransactionDetails.objects.filter(pk=template.pk).update(next_run=template.next_run)
+        self.assertEqual(recurring.materialize(now).created, 0)
+
+        occurrences = template.occurrences.order_by('date')
+        self.assertEqual([o.date.day for o in occurrences], [8, 15, 22, 29])
+        self.assertFalse(any(o.is_recurring for o in occurrences))
+        template.refresh_from_db()
+        self.assertEqual(template.next_run, timezone.make_aware(datetime(2024, 2, 5)))
+        self.assertEqual(Statistics.objects.get(user=self.user, date=date(2024, 1, 15)).total_expense, Decimal('10.00'))
+
+    def test_shards_partition_users(self):
+        self.make_template('daily', timezone.now() - timedelta(days=2))
+        owners = [shard for shard in range(4) if recurring.due(timezone.now(), shard, 4).exists()]
+        self.assertEqual(len(owners), 1)
+
+        call_command('materialize_recurring', shard=owners[0], shards=4, stdout=io.StringIO())
+        self.assertEqual(TransactionDetails.objects.filter(recurring_source__isnull=False).count(), 2)
+
+
+class RunningBalanceTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def balance(self):
+        return Profile.objects.get(user=self.user).total_balance
+
+    def test_balance_follows_every_write_path(self):
+        self.assertEqual(self.balance(), Decimal('0.00'))
+        self.client.post(reverse('create-transaction'), {'amount': '100.00', 'transaction_type': 'INCOME'}, format='json')
+        self.client.post(reverse('create-transactions-batch'), [
+            {'amount': '30.00', 'transaction_type': 'EXPENSE'},
+            {'amount': '5.00', 'transaction_type': 'TRANSFER'},
+        ], format='json')
+        self.assertEqual(self.balance(), Decimal('70.00'))
+
+        expense = TransactionDetails.objects.get(user=self.user, transaction_type='EXPENSE')
+        expense.amount = Decimal('45.00')
+        expense.save()
+        self.assertEqual(self.balance(), Decimal('55.00'))
+        expense.delete()
+        self.assertEqual(self.balance(), Decimal('100.00'))
+
+    def test_deleting_a_user_skips_per_transaction_work(self):
+        def delete_cost(user, expenses):
+            TransactionDetails.objects.bulk_create([
+                TransactionDetails(user=user, amount=Decimal('1.00'), transaction_type='EXPENSE', category=f'C{n}',
+                                   date=timezone.make_aware(datetime(2024, n % 12 + 1, 1)))
+                for n in range(expenses)
+            ])
+            TransactionDetails.objects.filter(user=user).first().delete()  # leaves a tombstone
+            with CaptureQueriesContext(connection) as queries:
+                user.delete()
+            return len(queries)
+
+        self.assertEqual(delete_cost(self.user, 3), delete_cost(make_user(phone_number='+919876543211'), 30))
+        self.assertFalse(TransactionTombstone.objects.exists())
+        self.assertFalse(TransactionDetails.objects.exists())
+
+    def test_reconcile_repairs_drift(self):
+        TransactionDetails.objects.create(user=self.user, amount=Decimal('12.50'), transaction_type='EXPENSE')
+        Profile.objects.filter(user=self.user).update(total_balance=Decimal('99.00'))
+        other = make_user(name='No Profile')
+        Profile.objects.filter(user=other).delete()
+
+        call_command('reconcile_balances', dry_run=True, stdout=io.StringIO())
+        self.assertEqual(self.balance(), Decimal('99.00'))
+
+        out = io.StringIO()
+        call_command('reconcile_balances', stdout=out)
+        self.assertEqual(self.balance(), Decimal('-12.50'))
+        self.assertTrue(Profile.objects.filter(user=other, total_balance=0).exists())
+        self.assertIn('Repaired 1 drifted balances; 1 users without a profile', out.getvalue())
+
+
+class TopSpendingTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        for day, amount, category in [
+            (3, '40.00', 'Food'), (4, '25.00', 'Food'), (5, '50.00', 'Rent'),
+            (6, '10.00', None), (7, '90.00', 'Travel'), (8, '500.00', None),
+        ]:
+            self.spend(amount, category, datetime(2024, 3, day))
+        self.spend('5.00', 'Food', datetime(2024, 4, 1))
+        TransactionDetails.objects.create(user=self.user, amount=Decimal('999.00'), transaction_type='INCOME',
+                                          date=timezone.make_aware(datetime(2024, 3, 1)))
+
+    def spend(self, amount, category, when):
+        return TransactionDetails.objects.create(user=self.user, amount=Decimal(amount), transaction_type='EXPENSE',
+                                                 category=category, date=timezone.make_aware(when))
+
+    def top(self, period):
+        return list(TopSpending.objects.filter(user=self.user, period=period).values_list('category', 'amount'))
+
+    def test_sql_and_heap_rank_alike(self):
+        topspending.compute(k=3, method='heap')
+        by_heap = list(TopSpending.objects.values_list('period', 'rank', 'category', 'amount'))
+        self.assertEqual(topspending.compute(k=3, method='sql'), 4)
+        self.assertEqual(list(TopSpending.objects.values_list('period', 'rank', 'category', 'amount')), by_heap)
+        self.assertEqual(self.top(date(2024, 3, 1)), [
+            ('Uncategorized', Decimal('510.00')), ('Travel', Decimal('90.00')), ('Food', Decimal('65.00')),
+        ])
+
+    def test_writes_refresh_computed_months_only(self):
+        topspending.compute(since=date(2024, 3, 1))
+        self.assertEqual(self.top(date(2024, 4, 1)), [('Food', Decimal('5.00'))])
+
+        self.spend('100.00', 'Rent', datetime(2024, 3, 20))
+        self.assertEqual([category for category, _ in self.top(date(2024, 3, 1))],
+                         ['Uncategorized', 'Rent', 'Travel', 'Food'])
+
+        self.spend('1.00', 'Food', datetime(2024, 5, 1))
+        self.assertFalse(TopSpending.objects.filter(period=date(2024, 5, 1)).exists())
+
+        TransactionDetails.objects.filter(category__isnull=True).delete()
+        self.assertEqual(self.top(date(2024, 3, 1)), [
+            ('Rent', Decimal('150.00')), ('Travel', Decimal('90.00')), ('Food', Decimal('65.00')),
+        ])
+
+
+class BenchCommandTests(TestCase):
+    def test_writes_percentiles_and_query_counts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench', users=2, transactions=3, requests=3, only=['list-transactions'],
+                         output=output, stdout=io.StringIO())
+            with open(output) as f:
+                results = json.load(f)
+        self.assertEqual(results['meta']['users'], 2)
+        endpoint = results['endpoints']['list-transactions']
+        self.assertEqual(endpoint['statuses'], [200])
+        self.assertLessEqual(endpoint['p50_ms'], endpoint['p99_ms'])
+        self.assertEqual(endpoint['queries'], 2)  # ETag version, page
+        # Everything seeded is rolled back.
+        self.assertFalse(TransactionDetails.objects.exists())
+
+    def test_admin_viewsets_are_benched_as_staff(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench', users=2, transactions=3, requests=2, only=['userdetails-list', 'item-detail'],
+                         output=output, stdout=io.StringIO())
+            with open(output) as f:
+                results = json.load(f)
+        self.assertEqual(results['endpoints']['userdetails-list']['statuses'], [200])
+        self.assertEqual(results['endpoints']['item-detail']['statuses'], [200])
+
+    def test_error_responses_fail_the_run(self):
+        scenario = ('get', lambda c: {'data': {'cursor': 'not-a-cursor'}})
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict('api.management.commands.bench.ENDPOINTS', {'list-transactions': scenario}):
+            with self.assertRaisesMessage(CommandError, 'non-2xx responses from: list-transactions'):
+                call_command('bench', users=2, transactions=3, requests=2, only=['list-transactions'],
+                             output=os.path.join(directory, 'bench.json'), stdout=io.StringIO())
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        metrics.registry.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def scrape(self, **headers):
+        response = Client().get('/metrics', **headers)
+        self.assertEqual(response.status_code, 200)
+        return dict(line.rsplit(' ', 1) for line in response.content.decode().splitlines() if not line.startswith('#'))
+
+    def test_records_route_latency_queries_and_size(self):
+        for _ in range(2):
+            size = len(self.client.get(reverse('list-transactions')).content)
+        self.client.get('/api/no-such-route/')
+
+        samples = self.scrape()
+        labels = 'route="/api/v1/transactions/",method="GET",status="200"'
+        self.assertEqual(samples[f'http_request_duration_seconds_count{{{labels}}}'], '2')
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'], '2')
+        # ETag version and page per request; the token lookup and the total
+        # count are cached after the first.
+        self.assertEqual(samples[f'http_request_db_queries_sum{{{labels}}}'], '6')
+        self.assertEqual(samples[f'http_response_size_bytes_total{{{labels}}}'], str(2 * size))
+        self.assertIn('http_request_duration_seconds_count{route="<unmatched>",method="GET",status="404"}', samples)
+        self.assertFalse(any('route="/metrics"' in key for key in self.scrape()))
+
+    async def test_async_requests_count_queries_of_sync_views(self):
+        response = await self.async_client.get(reverse('list-transactions'),
+                                               headers={'Authorization': f'Token {self.user.token}'})
+        self.assertEqual(response.status_code, 200)
+        samples = await sync_to_async(self.scrape)()
+        labels = 'route="/api/v1/transactions/",method="GET",status="200"'
+        # Token lookup, ETag version, page and total count, run on the view's worker thread.
+        self.assertEqual(samples[f'http_request_db_queries_sum{{{labels}}}'], '4')
+
+    def test_unknown_methods_share_one_series(self):
+        for method in ('BREW', 'PROPFIND'):
+            self.client.generic(method, reverse('list-transactions'))
+        samples = self.scrape()
+        self.assertIn('http_request_duration_seconds_count{route="/api/v1/transactions/",method="other",status="405"}', samples)
+        self.assertFalse(any('BREW' in key or 'PROPFIND' in key for key in samples))
+
+    def test_exited_threads_keep_their_counts_but_not_their_shards(self):
+        registry = metrics.Registry()
+        for _ in range(5):
+            thread = threading.Thread(target=registry.observe, args=('/r', 'GET', 200, 0.01, 1, 0.001, 10))
+            thread.start()
+            thread.join()
+        self.assertEqual(registry.snapshot()[('/r', 'GET', 200)].count, 5)
+        self.assertEqual(len(registry._shards), 0)
+
+    def test_token_protects_endpoint(self):
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(Client().get('/metrics').status_code, 403)
+            self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'declarative partitioning is PostgreSQL-only')
+class PartitioningTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def spend(self, when):
+        return TransactionDetails.objects.create(user=self.user, amount=Decimal('1.00'), transaction_type='EXPENSE',
+                                                 date=timezone.make_aware(when))
+
+    def partition_of(self, txn):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM api_transactiondetails WHERE id = %s', [txn.id])
+            return cursor.fetchone()[0]
+
+    def test_date_range_prunes_to_one_partition(self):
+        now = timezone.now()
+        plan = TransactionDetails.objects.filter(user=self.user, date__gte=now, date__lt=now + timedelta(hours=1)).explain()
+        month = partitioning.month_start(now)
+        self.assertIn(partitioning.partition_name(month), plan)
+        self.assertNotIn(partitioning.partition_name(partitioning.add_months(month, 1)), plan)
+        self.assertNotIn('_default', plan)
+
+    def test_create_adopts_rows_from_default_and_detach_archives(self):
+        old = self.spend(datetime(2020, 5, 17))
+        self.assertEqual(self.partition_of(old), 'api_transactiondetails_default')
+
+        call_command('create_partitions', since='2020-05', ahead=0, stdout=io.StringIO())
+        self.assertEqual(self.partition_of(old), 'api_transactiondetails_y2020m05')
+        with connection.cursor() as cursor:
+            self.assertEqual(partitioning.ensure_partitions(cursor, date(2020, 5, 1), 0), [])
+
+        call_command('detach_partitions', before='2020-06', stdout=io.StringIO())
+        self.assertFalse(TransactionDetails.objects.filter(pk=old.pk).exists())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM api_transactiondetails_y2020m05')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            self.assertEqual(partitioning.archives(cursor), ['api_transactiondetails_y2020m05'])
+
+        # Balances keep counting archived rows, and so does reconciliation.
+        out = io.StringIO()
+        call_command('reconcile_balances', dry_run=True, stdout=out)
+        self.assertIn('Found 0 drifted balances', out.getvalue())
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+
+    def test_reads_leave_primary_until_user_writes(self):
+        # 'default' doubles as the replica so routed queries still run.
+        with self.settings(DATABASE_REPLICAS=['default']), \
+                mock.patch('api.db_router.random.choice', return_value='default') as choice:
+            self.assertEqual(self.client.get(reverse('list-transactions')).status_code, 200)
+            choice.assert_called_once()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('create-transaction'),
+                                 {'amount': '5.00', 'transaction_type': 'EXPENSE'}, format='json')
+            choice.reset_mock()
+            self.assertEqual(self.client.get(reverse('list-transactions')).json()['count'], 1)
+            self.client.get(reverse('transaction-analytics'))
+            choice.assert_not_called()
+
+            other = make_user(phone_number='+919876543211')
+            self.assertEqual(db_router.replica_for(caching.transactions_scope(other.user_id)), 'default')
+            cache.clear()  # the sticky window has passed
+            self.assertEqual(db_router.replica_for(caching.transactions_scope(self.user.user_id)), 'default')
+
+    def test_router_keeps_writes_and_migrations_on_primary(self):
+        router = db_router.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(TransactionDetails))
+        with self.settings(DATABASE_REPLICAS=['replica_0']):
+            self.assertEqual(router.db_for_write(TransactionDetails), 'default')
+            self.assertFalse(router.allow_migrate('replica_0', 'api'))
+            self.assertTrue(router.allow_migrate('default', 'api'))
+        with self.settings(DATABASE_REPLICAS=[]):
+            db_router.mark_written('users')
+            self.assertIsNone(db_router.replica_for('users'))
+            self.assertFalse(db_router.recently_written('users'))
+
+
+class SearchTransactionsTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        now = timezone.now()
+        rows = [
+            ('Starbucks Coffee', 'Food', now),
+            ('Coffee with coffee friends', 'Food', now - timedelta(days=3)),
+            ('Weekly shop', 'Groceries', now - timedelta(days=1)),
+            ('Monthly rent', 'Rent', now - timedelta(days=2)),
+        ]
+        self.ids = {
+            description: TransactionDetails.objects.create(
+                user=self.user, amount=Decimal('4.50'), transaction_type='EXPENSE',
+                description=description, category=category, date=date
+            ).id
+            for description, category, date in rows
+        }
+        other = make_user(phone_number='+919876543211')
+        TransactionDetails.objects.create(user=other, amount=Decimal('1.00'), transaction_type='EXPENSE',
+                                          description='Coffee', category='Food')
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('search-transactions'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search is PostgreSQL-only')
+    def test_prefix_terms_ranked_and_paginated(self):
+        ids, cursor = [], None
+        while True:
+            page = self.search('COFF', page_size=1, **({'cursor': cursor} if cursor else {}))
+            ids += [row['id'] for row in page['data']]
+            cursor = page['next']
+            if not cursor:
+                break
+        # The double match ranks first despite being older.
+        self.assertEqual(ids, [self.ids['Coffee with coffee friends'], self.ids['Starbucks Coffee']])
+
+        self.assertEqual([row['id'] for row in self.search('starb coffee')['data']], [self.ids['Starbucks Coffee']])
+        self.assertEqual([row['id'] for row in self.search('groc')['data']], [self.ids['Weekly shop']])
+        self.assertEqual(self.search('nothing-like-this')['data'], [])
+
+    def test_fallback_matches_without_full_text(self):
+        with mock.patch('api.search.supports_full_text', return_value=False):
+            data = self.search('coff')['data']
+        self.assertEqual([row['id'] for row in data],
+                         [self.ids['Starbucks Coffee'], self.ids['Coffee with coffee friends']])
+
+    def test_rejects_empty_query(self):
+        response = self.client.get(reverse('search-transactions'), {'q': ' ,. '})
+        self.assertEqual(response.status_code, 400)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        self.payload = {'amount': '12.50', 'transaction_type': 'EXPENSE', 'category': 'Food'}
+
+    def create(self, key, payload=None):
+        return self.client.post(reverse('create-transaction'), payload or self.payload, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self.create('retry-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            retry = self.create('retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(TransactionDetails.objects.filter(user=self.user).count(), 1)
+
+        self.assertEqual(self.create('retry-2').status_code, 201)
+        self.assertEqual(self.create('retry-1', {**self.payload, 'amount': '99.00'}).status_code, 422)
+        other = make_user(phone_number='+919876543211')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other.token}')
+        self.assertEqual(self.create('retry-1').status_code, 201)  # keys are per user
+        self.assertEqual(TransactionDetails.objects.count(), 3)
+
+    def test_concurrent_duplicate_replays_winner(self):
+        first = self.create('race')
+        # The duplicate missed the lookup, as if it ran before the first committed.
+        with mock.patch('api.idempotency.lookup', side_effect=[None, idempotency.lookup(self.user.user_id, 'race')]):
+            duplicate = self.create('race')
+        self.assertEqual(duplicate.status_code, 201)
+        self.assertEqual(duplicate.json(), first.json())
+        self.assertEqual(TransactionDetails.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Profile.objects.get(user=self.user).total_balance, Decimal('-12.50'))
+
+    def test_non_object_body_is_rejected(self):
+        for body in ([self.payload], 'EXPENSE'):
+            self.assertEqual(self.create('bad-body', body).status_code, 400)
+            response = self.client.post(reverse('create-transaction'), body, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expired_keys_are_ignored_and_pruned(self):
+        self.create('old')
+        IdempotencyKey.objects.update(created_at=timezone.now() - idempotency.TTL - timedelta(minutes=1))
+        call_command('prune_idempotency_keys', stdout=io.StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.create('old')
+        IdempotencyKey.objects.update(created_at=timezone.now() - idempotency.TTL - timedelta(minutes=1))
+        self.assertEqual(self.create('old').status_code, 201)
+        self.assertEqual(TransactionDetails.objects.filter(user=self.user).count(), 3)
+
+
+class WriteBehindTests(TransactionTestCase):
+    # The flusher thread has its own connection, so rows must really commit.
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user()
+
+    def expense(self, amount='10.00', user_id=None):
+        return TransactionDetails(user_id=user_id or self.user.user_id, amount=Decimal(amount),
+                                  transaction_type='EXPENSE', category='Food', date=timezone.now())
+
+    def test_concurrent_submissions_share_a_commit(self):
+        queue = writebehind.WriteBehindQueue(batch_size=10, window=0.5)
+        futures = [queue.submit(self.expense()) for _ in range(10)]
+        saved = [future.result(timeout=5) for future in futures]
+        queue.close()
+        self.assertEqual((queue.batches, queue.written), (1, 10))
+        self.assertTrue(all(txn.pk for txn in saved))
+        self.assertEqual(TransactionDetails.objects.filter(user=self.user).count(), 10)
+        self.assertEqual(Profile.objects.get(user=self.user).total_balance, Decimal('-100.00'))
+
+    def test_close_drains_pending_and_rejects_new_work(self):
+        queue = writebehind.WriteBehindQueue(batch_size=100, window=60)
+        future = queue.submit(self.expense())
+        queue.close()
+        self.assertTrue(future.result(timeout=0).pk)
+        with self.assertRaises(writebehind.QueueClosed):
+            queue.submit(self.expense())
+
+    def test_bad_row_fails_alone(self):
+        queue = writebehind.WriteBehindQueue(batch_size=2, window=0.5)
+        good = queue.submit(self.expense())
+        bad = queue.submit(self.expense(user_id='NOSUCHID'))
+        self.assertTrue(good.result(timeout=5).pk)
+        with self.assertRaises(Exception):
+            bad.result(timeout=5)
+        queue.close()
+        self.assertEqual(TransactionDetails.objects.count(), 1)
+
+    def test_timed_out_request_withdraws_its_transaction(self):
+        queue = writebehind.WriteBehindQueue(batch_size=100, window=60, timeout=0.05)
+        with self.assertRaises(writebehind.QueueTimeout):
+            queue.save(self.expense())
+        queue.close()
+        self.assertEqual((queue.batches, TransactionDetails.objects.count()), (0, 0))
+
+    def test_flusher_survives_errors_outside_the_write(self):
+        queue = writebehind.WriteBehindQueue(batch_size=1, window=0)
+        with mock.patch.object(writebehind, 'close_old_connections', side_effect=[RuntimeError('boom'), None]):
+            with self.assertRaisesMessage(RuntimeError, 'boom'):
+                queue.save(self.expense())
+            self.assertTrue(queue.save(self.expense()).pk)
+        queue.close()
+        self.assertEqual(TransactionDetails.objects.count(), 1)
+
+    def test_create_transaction_through_queue(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.token}')
+        writebehind.reset_queue()
+        self.addCleanup(writebehind.reset_queue)
+        with self.settings(TRANSACTION_WRITE_BEHIND=True):
+            response = client.post(reverse('create-transaction'),
+                                   {'amount': '7.25', 'transaction_type': 'EXPENSE'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(TransactionDetails.objects.get().id, response.json()['data']['id'])
+        self.assertEqual(writebehind.get_queue().written, 1)
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'AdminPass123!'))
+        self.user = make_user(phone_number='+14155550100')
+        TransactionDetails.objects.bulk_create([
+            TransactionDetails(user=self.user, amount=Decimal('5.00'), transaction_type='EXPENSE',
+                               date=datetime(year, month, 10, tzinfo=dt_timezone.utc))
+            for year, month in ((2024, 3), (2024, 7), (2025, 1))
+        ])
+
+    def test_transaction_changelist_drills_down_by_year_and_month(self):
+        url = reverse('admin:api_transactiondetails_changelist')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertContains(response, '?date__year=2024')
+        self.assertContains(response, '?date__year=2025')
+
+        response = self.client.get(url, {'date__year': '2024'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertContains(response, '?date__month=3&amp;date__year=2024')
+        self.assertContains(response, '?date__month=7&amp;date__year=2024')
+        self.assertNotContains(response, '?date__month=1&amp;')
+
+        response = self.client.get(url, {'date__year': '2024', 'date__month': '7'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, 'date__day=10')
+
+    def test_transaction_search_by_user_id(self):
+        other = make_user(phone_number='+14155550199')
+        TransactionDetails.objects.create(user=other, amount=Decimal('1.00'), transaction_type='INCOME')
+        response = self.client.get(reverse('admin:api_transactiondetails_changelist'), {'q': other.user_id.lower()})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_user_search_matches_id_and_phone_prefixes(self):
+        make_user(phone_number='+919000000000')
+        url = reverse('admin:api_userdetails_changelist')
+        for term in (self.user.user_id[:4].lower(), '+1415'):
+            response = self.client.get(url, {'q': term})
+            self.assertEqual([row.pk for row in response.context['cl'].result_list], [self.user.pk], term)
+
+    @skipUnless(connection.vendor == 'postgresql', 'reltuples is PostgreSQL-only')
+    def test_paginator_estimates_unfiltered_counts(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE api_transactiondetails')
+        TransactionDetails.objects.create(user=self.user, amount=Decimal('1.00'), transaction_type='INCOME')
+        self.assertEqual(EstimatedCountPaginator(TransactionDetails.objects.all(), 100).count, 4)
+        with mock.patch('api.admin.ESTIMATE_THRESHOLD', 1):
+            self.assertEqual(EstimatedCountPaginator(TransactionDetails.objects.all(), 100).count, 3)
+        with mock.patch('api.admin.FILTERED_COUNT_LIMIT', 2):
+            filtered = TransactionDetails.objects.filter(user=self.user)
+            self.assertEqual(EstimatedCountPaginator(filtered, 100).count, 2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'varchar_pattern_ops is PostgreSQL-only')
+    def test_user_search_uses_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        queryset, _ = UserDetailsAdmin(UserDetails, site).get_search_results(None, UserDetails.objects.all(), '+1415')
+        plan = queryset.explain()
+        self.assertIn('userdetails_phone_idx', plan)
+        self.assertNotIn('Seq Scan', plan)
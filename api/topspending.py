@@ -0,0 +1,124 @@
+"""
+Per-user, per-month top-k expense categories, stored in ``TopSpending``.
+
+Expenses are summed per (user, month, category) in the database and ranked
+with ``ROW_NUMBER() OVER (PARTITION BY user, month ...)``, so only the top
+``k`` rows of each month ever leave the database. ``method='heap'`` ranks in
+Python instead, streaming the grouped totals one (user, month) at a time
+through ``heapq``; it serves as the fallback where window functions are
+unavailable.
+
+``compute`` (re)builds a range of months in bulk. ``refresh`` is called from
+``api.rollups`` on every expense write and recomputes just the months of
+that user that have already been computed.
+"""
+import heapq
+from datetime import date, datetime, time
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import DateField, F, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, RowNumber, TruncMonth
+from django.utils import timezone
+
+from .analytics import UNCATEGORIZED
+from .models import TopSpending, TransactionDetails
+
+# Categories kept per month. compute and refresh must agree on it, so it is a
+# setting rather than a per-run option.
+TOP_K = getattr(settings, 'TOP_SPENDING_K', 5)
+METHODS = ('sql', 'heap')
+
+
+def period_of(value):
+    """First day of the month a date or datetime counts towards, in the current time zone."""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return date(value.year, value.month, 1)
+
+
+def _month_bounds(period):
+    following = date(period.year + period.month // 12, period.month % 12 + 1, 1)
+    return (timezone.make_aware(datetime.combine(period, time.min)),
+            timezone.make_aware(datetime.combine(following, time.min)))
+
+
+def _totals(transactions):
+    return (
+        transactions
+        .filter(transaction_type='EXPENSE')
+        .annotate(
+            period=TruncMonth('date', output_field=DateField()),
+            bucket=Coalesce('category', Value(UNCATEGORIZED)),
+        )
+        .values('user_id', 'period', 'bucket')
+        .annotate(total=Sum('amount'))
+    )
+
+
+def _ranked_sql(transactions, k):
+    ranked = _totals(transactions).annotate(rank=Window(
+        RowNumber(),
+        partition_by=[F('user_id'), F('period')],
+        order_by=[F('total').desc(), F('bucket').asc()],
+    ))
+    return ranked.filter(rank__lte=k).order_by().iterator(chunk_size=2000)
+
+
+def _ranked_heap(transactions, k):
+    rows = _totals(transactions).order_by('user_id', 'period').iterator(chunk_size=2000)
+    for _, group in groupby(rows, key=itemgetter('user_id', 'period')):
+        top = heapq.nsmallest(k, group, key=lambda row: (-row['total'], row['bucket']))
+        for rank, row in enumerate(top, 1):
+            yield {**row, 'rank': rank}
+
+
+def _rank(transactions, k, method):
+    if method is None:
+        method = 'sql' if connection.features.supports_over_clause else 'heap'
+    if method not in METHODS:
+        raise ValueError(f'method must be one of {", ".join(METHODS)}')
+    ranked = _ranked_sql(transactions, k) if method == 'sql' else _ranked_heap(transactions, k)
+    return (
+        TopSpending(user_id=row['user_id'], period=row['period'], rank=row['rank'],
+                    category=row['bucket'], amount=row['total'])
+        for row in ranked
+    )
+
+
+def compute(user_ids=None, since=None, method=None, k=TOP_K):
+    """
+    Rebuild TopSpending for ``user_ids`` (all users if None) from the month
+    of ``since`` onwards (all months if None). Returns the rows written.
+    """
+    transactions = TransactionDetails.objects.all()
+    existing = TopSpending.objects.all()
+    if user_ids is not None:
+        transactions = transactions.filter(user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+    if since is not None:
+        since = period_of(since)
+        transactions = transactions.filter(date__gte=_month_bounds(since)[0])
+        existing = existing.filter(period__gte=since)
+    with transaction.atomic():
+        existing.delete()
+        return len(TopSpending.objects.bulk_create(_rank(transactions, k, method), batch_size=2000))
+
+
+def refresh(user_id, periods, k=TOP_K):
+    """Recompute those of ``periods`` that ``user_id`` already has TopSpending for."""
+    computed = set(
+        TopSpending.objects
+        .filter(user_id=user_id, period__in=set(periods), rank=1)
+        .values_list('period', flat=True)
+    )
+    if not computed:
+        return
+    window = Q()
+    for period in computed:
+        start, end = _month_bounds(period)
+        window |= Q(date__gte=start, date__lt=end)
+    TopSpending.objects.filter(user_id=user_id, period__in=computed).delete()
+    TopSpending.objects.bulk_create(_rank(TransactionDetails.objects.filter(window, user_id=user_id), k, None))
@@ -1,8 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .async_views import create_user_async, login_user_async
 from .views import (
     ItemViewSet, UserDetailsViewSet, api_root, create_user, 
-    get_all_users, login_user, create_transaction, list_transactions
+    get_all_users, login_user, create_transaction, list_transactions,
+    create_transactions_batch, transaction_summary, export_transactions,
+    import_transactions_file, transaction_analytics, sync_transactions, search_transactions
 )
 
 router = DefaultRouter()
@@ -15,6 +18,15 @@ urlpatterns = [
     path('v1/create_user/', create_user, name='create-user'),
     path('v1/get_all_users/', get_all_users, name='get-all-users'),
     path('v1/login/', login_user, name='login_user'),
+    path('v1/async/create_user/', create_user_async, name='create-user-async'),
+    path('v1/async/login/', login_user_async, name='login-user-async'),
     path('v1/create_transaction/', create_transaction, name='create-transaction'),
     path('v1/transactions/', list_transactions, name='list-transactions'),
+    path('v1/transactions/batch/', create_transactions_batch, name='create-transactions-batch'),
+    path('v1/transactions/sync/', sync_transactions, name='sync-transactions'),
+    path('v1/transactions/search/', search_transactions, name='search-transactions'),
+    path('v1/transactions/export/', export_transactions, name='export-transactions'),
+    path('v1/transactions/import/', import_transactions_file, name='import-transactions'),
+    path('v1/summary/', transaction_summary, name='transaction-summary'),
+    path('v1/analytics/', transaction_analytics, name='transaction-analytics'),
 ] 
\ No newline at end of file
@@ -1,17 +1,153 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
+from rest_framework.decorators import (
+    api_view, authentication_classes, parser_classes, permission_classes, renderer_classes
+)
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-from .models import Item, UserDetails, TransactionDetails
-from .serializers import ItemSerializer, UserDetailsSerializer, TransactionDetailsSerializer
+from .models import Item, UserDetails, TransactionDetails, TransactionTombstone, Statistics
+from .serializers import (
+    ItemSerializer, UserDetailsSerializer, TransactionInputSerializer,
+    TransactionDetailsReadSerializer, TransactionSyncSerializer, UserDetailsReadSerializer
+)
+from .authentication import UserDetailsTokenAuthentication
+from .db_router import read_from_replica
+from . import analytics, caching, dates, idempotency, recurring, rollups, search, writebehind
+from .exports import EXPORT_FORMATS
+from .importer import StatementImportError, import_transactions
+from .renderers import CSVRenderer, FormatParamNegotiation, NDJSONRenderer, ORJSONRenderer, negotiation_class
+from .pagination import (
+    MAX_PAGE_SIZE, PaginationError, decode_cursor, encode_cursor, get_page_size,
+    keyset_filter, paginate_keyset
+)
+import io
 import uuid
+from decimal import Decimal, InvalidOperation
 from django.core.exceptions import ObjectDoesNotExist
-from datetime import datetime
+from django.db import transaction as db_transaction
+from rest_framework.exceptions import ValidationError
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
+from django.db.models import Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
 
 # Create your views here.
 
+# Newest first; id breaks ties between transactions sharing a timestamp.
+TRANSACTION_ORDERING = ('-date', '-id')
+
+# Alphabetical; user_id breaks ties between users sharing a name.
+USER_ORDERING = ('name', 'user_id')
+
+# period -> (Trunc kind, default look-back in days) for transaction_summary.
+SUMMARY_PERIODS = {
+    'daily': ('day', 30),
+    'weekly': ('week', 12 * 7),
+    'monthly': ('month', 365),
+}
+CENT = Decimal('0.01')
+
+# Upper bound on entries accepted by one create_transactions_batch call.
+MAX_BATCH_SIZE = 1000
+
+# How many rejected lines import_transactions_file echoes back.
+MAX_REPORTED_REJECTS = 100
+
+# Delta sync walks changes in (change_seq, id) order. A user's change_seq
+# values commit in order (see api.caching), so a row can never land behind
+# a cursor that was already handed out.
+SYNC_ORDERING = ('change_seq', 'id')
+# Tombstones are pruned after this long; older cursors need a full resync.
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+SYNC_CURSOR_MAX_ID = 2 ** 63 - 1
+
+def _transactions_scope(request):
+    return caching.transactions_scope(request.user.user_id)
+
+def _date_param(request, name):
+    """Parse an optional YYYY-MM-DD query parameter; ValueError if malformed."""
+    value = request.query_params.get(name)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def _money(value):
+    """Format a summed amount with two places, whatever scale the database returned."""
+    return '{:f}'.format(value.quantize(CENT))
+
+def _amount_param(request, name):
+    """Parse an optional non-negative decimal query parameter; ValueError if malformed."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'{name} must be a number')
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f'{name} must be a non-negative number')
+    return amount
+
+def _transaction_filters(request):
+    """
+    ORM lookups for the optional ``list_transactions`` filters; ValueError
+    with a client-facing message if one is invalid. Every filter is a plain
+    equality or range on a column, so the (user, ...) indexes keep serving
+    the query. ``from``/``to`` are inclusive local dates turned into a
+    half-open timestamp range, which also prunes date partitions.
+    """
+    try:
+        date_from = _date_param(request, 'from')
+        date_to = _date_param(request, 'to')
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+    if date_from and date_to and date_from > date_to:
+        raise ValueError('"from" must not be after "to"')
+    min_amount = _amount_param(request, 'min_amount')
+    max_amount = _amount_param(request, 'max_amount')
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise ValueError('min_amount must not be greater than max_amount')
+
+    filters = dates.range_filters(date_from, date_to)
+    transaction_type = request.query_params.get('type')
+    if transaction_type:
+        transaction_type = transaction_type.upper()
+        if transaction_type not in dict(TransactionDetails.TRANSACTION_TYPES):
+            types = ', '.join(value for value, _ in TransactionDetails.TRANSACTION_TYPES)
+            raise ValueError(f'type must be one of: {types}')
+        filters['transaction_type'] = transaction_type
+    category = request.query_params.get('category')
+    if category:
+        filters['category'] = category
+    if min_amount is not None:
+        filters['amount__gte'] = min_amount
+    if max_amount is not None:
+        filters['amount__lte'] = max_amount
+    return filters
+
+def _not_modified(request, etag):
+    """
+    Return a 304 response if ``If-None-Match`` matches ``etag``, else None.
+    ``etag`` should be attached to the full response with _with_etag.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = parse_etags(if_none_match)
+        if '*' in tags or etag in tags:
+            return _with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+    return None
+
+def _with_etag(response, etag):
+    response['ETag'] = etag
+    # Let clients keep the body but revalidate it on every use.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @api_view(['GET'])
 def api_root(request, format=None):
     return Response({
@@ -22,15 +158,20 @@ def api_root(request, format=None):
         'create_transaction': reverse('create-transaction', request=request, format=format),
     })
 
+# Staff-only: these expose and rewrite every row, tokens and password
+# hashes included, so app-user tokens are not accepted here, and neither
+# are non-staff Django accounts.
 class ItemViewSet(viewsets.ModelViewSet):
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
 
 class UserDetailsViewSet(viewsets.ModelViewSet):
     queryset = UserDetails.objects.all()
     serializer_class = UserDetailsSerializer
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -106,16 +247,44 @@ def login_user(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@read_from_replica(lambda request: caching.USERS_SCOPE)
 def get_all_users(request):
+    """
+    List users ordered by name, paginated by cursor.
+
+    Pass ``page_size`` (default 50, max 500) and follow ``?cursor=<next>``
+    until ``next`` is null. Pages and the total count are served from the
+    cache until a UserDetails row is created, updated or deleted.
+    """
+    try:
+        page_size = get_page_size(request)
+        cursor = request.query_params.get('cursor')
+        page_key = caching.users_page_key(page_size, cursor)
+        page = cache.get(page_key)
+        if page is None:
+            users, next_cursor = paginate_keyset(
+                UserDetailsReadSerializer.values(UserDetails.objects.all()),
+                request,
+                ordering=USER_ORDERING,
+                page_size=page_size,
+            )
+            page = {'next': next_cursor, 'data': UserDetailsReadSerializer.many(users)}
+            cache.set(page_key, page, timeout=caching.USERS_PAGE_TIMEOUT)
+    except PaginationError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        users = UserDetails.objects.all().order_by('name')  # Get all users ordered by name
-        serializer = UserDetailsSerializer(users, many=True)
-        
         return Response({
             'status': 'success',
             'message': 'Users retrieved successfully',
-            'total_users': len(serializer.data),
-            'data': serializer.data
+            'total_users': caching.users_count(UserDetails.objects.all()),
+            'count': len(page['data']),
+            'page_size': page_size,
+            'next': page['next'],
+            'data': page['data']
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -123,31 +292,54 @@ def get_all_users(request):
             'message': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _created_transaction_body(user, transaction):
+    return {
+        'status': 'success',
+        'message': 'Transaction created successfully',
+        'data': {
+            'id': transaction.id,
+            'user_id': user.user_id,
+            'amount': str(transaction.amount),
+            'transaction_type': transaction.transaction_type,
+            'description': transaction.description,
+            'category': transaction.category,
+            'date': transaction.date.strftime('%Y-%m-%d %H:%M:%S'),
+            'is_recurring': transaction.is_recurring,
+            'recurring_frequency': transaction.recurring_frequency
+        }
+    }
+
 @api_view(['POST'])
-@permission_classes([AllowAny])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
 def create_transaction(request):
     """
     Create a new transaction detail entry with token-based authorization.
-    Token should be passed in the Authorization header as 'Bearer <token>'
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    Send an ``Idempotency-Key`` header (e.g. a UUID) to make retries safe:
+    repeating the request with the same key returns the original response
+    instead of creating another transaction.
     """
-    # Get token from Authorization header
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Token '):
-        return Response({
-            'status': 'error',
-            'message': 'Authorization header with Bearer token is required'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-    
-    token = auth_header.split(' ')[1]
-    
-    try:
-        # Find user by token
-        user = UserDetails.objects.get(token=token)
-    except ObjectDoesNotExist:
+    user = request.user
+
+    if not isinstance(request.data, dict):
         return Response({
             'status': 'error',
-            'message': 'Invalid token or user not found'
-        }, status=status.HTTP_401_UNAUTHORIZED)
+            'message': 'Request body must be an object'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    key = request.headers.get(idempotency.HEADER)
+    if key is not None:
+        if not key or len(key) > idempotency.MAX_KEY_LENGTH:
+            return Response({
+                'status': 'error',
+                'message': f'{idempotency.HEADER} must be 1 to {idempotency.MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        request_digest = idempotency.fingerprint(request.data)
+        record = idempotency.lookup(user.user_id, key)
+        if record is not None:
+            return idempotency.replay(record, request_digest)
     
     # Validate required fields
     amount = request.data.get('amount')
@@ -182,7 +374,6 @@ def create_transaction(request):
     
     # Create transaction data
     transaction_data = {
-        'user': user.user_id,
         'amount': amount,
         'transaction_type': transaction_type,
         'date': date,
@@ -193,24 +384,35 @@ def create_transaction(request):
     }
     
     # Create serializer and validate
-    serializer = TransactionDetailsSerializer(data=transaction_data)
+    serializer = TransactionInputSerializer(data=transaction_data)
     if serializer.is_valid():
-        transaction = serializer.save()
-        return Response({
-            'status': 'success',
-            'message': 'Transaction created successfully',
-            'data': {
-                'id': transaction.id,
-                'user_id': transaction.user.user_id,
-                'amount': str(transaction.amount),
-                'transaction_type': transaction.transaction_type,
-                'description': transaction.description,
-                'category': transaction.category,
-                'date': transaction.date.strftime('%Y-%m-%d %H:%M:%S'),
-                'is_recurring': transaction.is_recurring,
-                'recurring_frequency': transaction.recurring_frequency
-            }
-        }, status=status.HTTP_201_CREATED)
+        if key is None and writebehind.enabled():
+            transaction = TransactionDetails(user=user, **serializer.validated_data)
+            # No pre_save signal on the bulk path.
+            recurring.schedule(transaction)
+            try:
+                transaction = writebehind.get_queue().save(transaction)
+            except (writebehind.QueueClosed, writebehind.QueueTimeout):
+                with db_transaction.atomic():
+                    transaction = serializer.save(user=user)
+            except writebehind.WriteTimeout:
+                return Response({
+                    'status': 'error',
+                    'message': 'Transaction write timed out; check your transactions before retrying'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return Response(_created_transaction_body(user, transaction), status=status.HTTP_201_CREATED)
+
+        # The insert, its rollup update and the idempotency record commit together.
+        try:
+            with db_transaction.atomic():
+                record = key and idempotency.claim(user.user_id, key, request_digest)
+                transaction = serializer.save(user=user)
+                body = _created_transaction_body(user, transaction)
+                if record:
+                    idempotency.complete(record, status.HTTP_201_CREATED, body)
+        except idempotency.KeyConflict:
+            return idempotency.replay(idempotency.lookup(user.user_id, key), request_digest)
+        return Response(body, status=status.HTTP_201_CREATED)
     else:
         return Response({
             'status': 'error',
@@ -218,45 +420,471 @@ def create_transaction(request):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def create_transactions_batch(request):
+    """
+    Create many transactions for the token's user in one request.
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    The body is ``{"transactions": [...]}`` (or a bare list) where each entry
+    has the same fields as create_transaction. Every entry is validated in a
+    single pass; valid entries are written with one bulk INSERT inside one
+    DB transaction and invalid ones are reported by their index.
+    """
+    user = request.user
+
+    items = request.data
+    if isinstance(items, dict):
+        items = items.get('transactions')
+    if not isinstance(items, list) or not items:
+        return Response({
+            'status': 'error',
+            'message': 'transactions must be a non-empty list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_SIZE:
+        return Response({
+            'status': 'error',
+            'message': f'A batch may contain at most {MAX_BATCH_SIZE} transactions'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # One serializer instance validates every entry, the way ListSerializer
+    # does internally, but invalid entries don't reject the valid ones.
+    validator = TransactionInputSerializer()
+    indexes, objs, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            validated = validator.run_validation(item)
+        except ValidationError as e:
+            errors.append({'index': index, 'errors': e.detail})
+            continue
+        indexes.append(index)
+        obj = TransactionDetails(user=user, **validated)
+        recurring.schedule(obj)
+        objs.append(obj)
+
+    if not objs:
+        return Response({
+            'status': 'error',
+            'message': 'Invalid transaction data',
+            'created': 0,
+            'failed': len(errors),
+            'errors': errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    with db_transaction.atomic():
+        change_seq = caching.bump_transactions_version(user.user_id)
+        for obj in objs:
+            obj.change_seq = change_seq
+        created = TransactionDetails.objects.bulk_create(objs, batch_size=500)
+        # bulk_create sends no signals, so fold the batch into the rollups here
+        # (recurring templates were scheduled above for the same reason).
+        rollups.record_many(created)
+
+    return Response({
+        'status': 'success',
+        'message': f'Created {len(created)} of {len(items)} transactions',
+        'created': len(created),
+        'failed': len(errors),
+        'data': [
+            {'index': index, 'id': obj.id}
+            for index, obj in zip(indexes, created)
+        ],
+        'errors': errors
+    }, status=status.HTTP_201_CREATED)
+
 @api_view(['GET'])
-@permission_classes([AllowAny])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@read_from_replica(_transactions_scope)
 def list_transactions(request):
     """
-    List all transactions for a user based on their token.
+    List a user's transactions, newest first, based on their token.
     Token should be passed in the Authorization header as 'Token <token>'
+
+    Results are paginated by cursor: pass ``page_size`` (default 50, max 500)
+    and follow the opaque ``next`` cursor via ``?cursor=<next>`` until it is null.
+    ``count`` is the size of the page and ``total_transactions`` the number
+    of transactions matching the filters, counted once per transactions version.
+
+    Optional filters: ``from``/``to`` (inclusive, YYYY-MM-DD), ``type``
+    (INCOME, EXPENSE, TRANSFER or REFUND), ``category`` (exact match) and
+    ``min_amount``/``max_amount`` (inclusive).
     """
-    # Get token from Authorization header
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Token '):
+    user = request.user
+
+    try:
+        filters = _transaction_filters(request)
+    except ValueError as e:
         return Response({
             'status': 'error',
-            'message': 'Authorization header with Token is required'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-    
-    token = auth_header.split(' ')[1]
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    version = caching.transactions_version(user.user_id)
+    etag = caching.transactions_etag(user.user_id, request.get_full_path(), version=version)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
     
+    matching = TransactionDetails.objects.filter(user=user, **filters)
     try:
-        # Find user by token
-        user = UserDetails.objects.get(token=token)
-    except ObjectDoesNotExist:
+        page_size = get_page_size(request)
+        # Keyset pagination on (date, id): every page is a single index seek,
+        # no matter how deep into the history the client has scrolled.
+        transactions, next_cursor = paginate_keyset(
+            TransactionDetailsReadSerializer.values(matching),
+            request,
+            ordering=TRANSACTION_ORDERING,
+            page_size=page_size,
+        )
+    except PaginationError as e:
         return Response({
             'status': 'error',
-            'message': 'Invalid token or user not found'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-    
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        # Get all transactions for the user
-        transactions = TransactionDetails.objects.filter(user=user).order_by('-date')
-        serializer = TransactionDetailsSerializer(transactions, many=True)
-        
-        return Response({
+        return _with_etag(Response({
             'status': 'success',
             'message': 'Transactions retrieved successfully',
-            'total_transactions': len(serializer.data),
-            'data': serializer.data
-        }, status=status.HTTP_200_OK)
+            'count': len(transactions),
+            # Every matching transaction, not just this page, as before pagination.
+            'total_transactions': caching.transactions_count(user.user_id, version, matching, sorted(filters.items())),
+            'page_size': page_size,
+            'next': next_cursor,
+            'data': TransactionDetailsReadSerializer.many(transactions)
+        }, status=status.HTTP_200_OK), etag)
     except Exception as e:
         return Response({
             'status': 'error',
             'message': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@read_from_replica(_transactions_scope)
+def search_transactions(request):
+    """
+    Search the token's user's transactions by description and category.
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    ``q`` holds the search terms. Every term must match the start of a word
+    ("starb" finds "Starbucks"). Best matches come first, then newest.
+    Results are paginated by cursor like ``list_transactions``.
+    """
+    user = request.user
+
+    words = search.terms(request.query_params.get('q', ''))
+    if not words:
+        return Response({
+            'status': 'error',
+            'message': 'q must contain at least one word'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = caching.transactions_etag(user.user_id, request.get_full_path())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    try:
+        page_size = get_page_size(request)
+        matches, ordering = search.search(
+            TransactionDetailsReadSerializer.values(TransactionDetails.objects.filter(user=user)), words
+        )
+        transactions, next_cursor = paginate_keyset(matches, request, ordering=ordering, page_size=page_size)
+    except PaginationError as e:
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return _with_etag(Response({
+        'status': 'success',
+        'message': 'Transactions retrieved successfully',
+        'count': len(transactions),
+        'page_size': page_size,
+        'next': next_cursor,
+        'data': TransactionDetailsReadSerializer.many(transactions)
+    }, status=status.HTTP_200_OK), etag)
+
+@api_view(['GET'])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@read_from_replica(_transactions_scope)
+def transaction_summary(request):
+    """
+    Income/expense totals per day, week or month for the token's user.
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    Query parameters: ``period`` (daily, weekly or monthly; default daily)
+    and an optional ``from``/``to`` date range as YYYY-MM-DD. Totals come
+    from the daily Statistics rollups, so the cost is proportional to the
+    number of days in the range rather than the number of transactions.
+    """
+    user = request.user
+
+    period = request.query_params.get('period', 'daily')
+    if period not in SUMMARY_PERIODS:
+        return Response({
+            'status': 'error',
+            'message': f'period must be one of: {", ".join(SUMMARY_PERIODS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    kind, lookback_days = SUMMARY_PERIODS[period]
+
+    try:
+        date_to = _date_param(request, 'to') or timezone.localdate()
+        date_from = _date_param(request, 'from') or date_to - timedelta(days=lookback_days)
+    except ValueError:
+        return Response({
+            'status': 'error',
+            'message': 'Invalid date format. Use YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = caching.transactions_etag(user.user_id, 'summary', period, date_from, date_to)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    rows = (
+        Statistics.objects
+        .filter(user=user, date__range=(date_from, date_to))
+        .annotate(period=Trunc('date', kind))
+        .values('period')
+        .annotate(income=Sum('total_income'), expense=Sum('total_expense'))
+        .order_by('period')
+    )
+
+    return _with_etag(Response({
+        'status': 'success',
+        'message': 'Summary retrieved successfully',
+        'period': period,
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'data': [
+            {
+                'period': row['period'].isoformat(),
+                'total_income': _money(row['income']),
+                'total_expense': _money(row['expense']),
+                'net': _money(row['income'] - row['expense'])
+            }
+            for row in rows
+        ]
+    }, status=status.HTTP_200_OK), etag)
+
+@negotiation_class(FormatParamNegotiation)
+@api_view(['GET'])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@renderer_classes([ORJSONRenderer, CSVRenderer, NDJSONRenderer])
+def export_transactions(request):
+    """
+    Stream all of the token's user's transactions as a download.
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    Query parameters: ``format`` (csv or ndjson; default csv) and an optional
+    inclusive ``from``/``to`` date range as YYYY-MM-DD. Rows are streamed
+    from a server-side cursor, so memory use does not grow with history size.
+    """
+    user = request.user
+
+    export_format = request.query_params.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response({
+            'status': 'error',
+            'message': f'format must be one of: {", ".join(EXPORT_FORMATS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    generate, content_type = EXPORT_FORMATS[export_format]
+
+    try:
+        date_from = _date_param(request, 'from')
+        date_to = _date_param(request, 'to')
+    except ValueError:
+        return Response({
+            'status': 'error',
+            'message': 'Invalid date format. Use YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    transactions = (
+        TransactionDetails.objects
+        .filter(user=user, **dates.range_filters(date_from, date_to))
+        .order_by(*TRANSACTION_ORDERING)
+    )
+
+    response = StreamingHttpResponse(generate(transactions), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="transactions.{export_format}"'
+    return response
+
+@api_view(['POST'])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser])
+def import_transactions_file(request):
+    """
+    Bulk import a bank statement CSV uploaded as the multipart field ``file``.
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    Columns: date,amount,transaction_type,description,category (header row
+    required). Valid lines are loaded with COPY on PostgreSQL; invalid lines
+    are skipped and reported by line number.
+    """
+    user = request.user
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({
+            'status': 'error',
+            'message': 'A CSV file is required in the "file" field'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = import_transactions(user.user_id, lines)
+    except StatementImportError as e:
+        return Response({
+            'status': 'error',
+            'message': f'Could not import file: {e}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'status': 'success',
+        'message': f'Imported {result.imported} transactions',
+        'imported': result.imported,
+        'rejected': len(result.rejects),
+        'rows_per_second': round(result.rows_per_second),
+        'errors': [
+            {'line': line_number, 'message': message}
+            for line_number, message in result.rejects[:MAX_REPORTED_REJECTS]
+        ]
+    }, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@read_from_replica(_transactions_scope)
+def transaction_analytics(request):
+    """
+    Chart data for the token's user: expense breakdown by category, monthly
+    income/expense trend with a 3-month rolling mean, and percentiles of
+    individual expenses.
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    Query parameters: optional inclusive ``from``/``to`` dates as YYYY-MM-DD,
+    defaulting to the last twelve calendar months.
+    """
+    user = request.user
+
+    try:
+        default_from, default_to = analytics.default_range(timezone.localdate())
+        date_from = _date_param(request, 'from') or default_from
+        date_to = _date_param(request, 'to') or default_to
+    except ValueError:
+        return Response({
+            'status': 'error',
+            'message': 'Invalid date format. Use YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if date_from > date_to:
+        return Response({
+            'status': 'error',
+            'message': '"from" must not be after "to"'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = caching.transactions_etag(user.user_id, 'analytics', date_from, date_to)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    return _with_etag(Response({
+        'status': 'success',
+        'message': 'Analytics retrieved successfully',
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'data': analytics.compute(user, date_from, date_to)
+    }, status=status.HTTP_200_OK), etag)
+
+@api_view(['GET'])
+@authentication_classes([UserDetailsTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def sync_transactions(request):
+    """
+    Transactions inserted, updated or deleted since a cursor.
+    Token should be passed in the Authorization header as 'Token <token>'
+
+    Call without ``since`` for a full download, then keep passing the
+    returned ``next`` as ``?since=``. ``has_more`` means another page is
+    ready right away. ``upserted`` rows replace the client's copy by id and
+    ``deleted`` lists ids to drop. A 410 means the cursor is older than the
+    tombstone retention, or predates change sequences, and the client must
+    start over without ``since``.
+    """
+    user = request.user
+
+    try:
+        page_size = get_page_size(request, default=MAX_PAGE_SIZE)
+        position = synced_at = None
+        expired = False
+        since = request.query_params.get('since')
+        if since:
+            values = decode_cursor(since)
+            if len(values) == 2:
+                expired = True  # an (updated_at, id) cursor from before change_seq
+            elif len(values) == 3:
+                position = [int(values[0]), int(values[1])]
+                # When the client's copy was last complete; it bounds the
+                # tombstones the cursor relies on.
+                synced_at = parse_datetime(values[2])
+                if synced_at is None or timezone.is_naive(synced_at):
+                    raise PaginationError('Invalid cursor')
+            else:
+                raise PaginationError('Invalid cursor')
+    except (PaginationError, TypeError, ValueError):
+        return Response({
+            'status': 'error',
+            'message': 'Invalid since cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    now = timezone.now()
+    if expired or (synced_at and synced_at < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)):
+        return Response({
+            'status': 'error',
+            'message': 'Cursor has expired; sync again without since'
+        }, status=status.HTTP_410_GONE)
+
+    # Everything stamped up to the committed version is visible now.
+    version = caching.committed_version(user.user_id) or 0
+    changed = TransactionDetails.objects.filter(user=user, change_seq__lte=version)
+    if position:
+        changed = changed.filter(keyset_filter(SYNC_ORDERING, position))
+    rows = list(
+        changed.values(*TransactionSyncSerializer.fields, 'change_seq').order_by(*SYNC_ORDERING)[:page_size + 1]
+    )
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if has_more:
+        end = [rows[-1]['change_seq'], rows[-1]['id']]
+        synced_at = synced_at or now
+    else:
+        end = position if position and position[0] > version else [version, SYNC_CURSOR_MAX_ID]
+        synced_at = now
+
+    deleted = []
+    if position:
+        # Deletions in the same stretch of the sequence this page covers.
+        deleted = list(
+            TransactionTombstone.objects
+            .filter(user_id=user.user_id, change_seq__gt=position[0], change_seq__lte=end[0])
+            .values_list('transaction_id', flat=True)
+        )
+
+    return Response({
+        'status': 'success',
+        'message': 'Changes retrieved successfully',
+        'has_more': has_more,
+        'next': encode_cursor([end[0], end[1], synced_at.isoformat()]),
+        'data': {
+            'upserted': TransactionSyncSerializer.many(rows),
+            'deleted': deleted
+        }
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,202 @@
+"""
+Opt-in write-behind batching of create_transaction inserts.
+
+With ``TRANSACTION_WRITE_BEHIND`` on, create_transaction validates as
+usual and then hands its unsaved TransactionDetails to the process's
+``WriteBehindQueue``, blocking until it is written. One flusher thread
+collects pending transactions. It flushes when it has ``batch_size`` of
+them or when the first has waited ``window`` seconds, whichever comes
+first. A flush writes the whole batch in one DB transaction: one bulk
+INSERT, one pass over the rollups, one commit. Each waiting request is
+then released with its saved row, so a response still means the row is
+committed. Commit latency is paid once per batch instead of once per
+request, and the added latency is bounded by the window plus one flush.
+
+Requests can only share a batch if one process serves them concurrently,
+e.g. WSGI with threaded workers (``gunicorn --threads 16``). Under ASGI
+Django runs sync views one at a time per process, so leave it off there.
+
+If a batch fails, its transactions are retried one by one, so a bad row
+fails only its own request. An error outside the write (e.g. while closing
+stale connections) fails that batch and the flusher carries on, and a
+flusher that died anyway is restarted by the next submission.
+
+A request waits at most ``timeout`` seconds for its batch. If the flusher
+has not picked its transaction up by then, the transaction is withdrawn
+(``QueueTimeout``) and the request writes it directly. One already being
+flushed gets one more ``timeout`` to finish before ``WriteTimeout``, whose
+outcome is unknown. ``close()`` runs at interpreter exit. It stops
+taking new work, flushes everything pending and waits for the flusher.
+Requests that arrive after that write directly.
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from . import caching, rollups
+from .models import TransactionDetails
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_WINDOW_MS = 5
+DEFAULT_TIMEOUT_MS = 2000
+_STOP = object()
+
+
+class QueueClosed(Exception):
+    pass
+
+
+class QueueTimeout(Exception):
+    """The transaction was withdrawn from the queue unwritten."""
+
+
+class WriteTimeout(Exception):
+    """The transaction's batch was still being written; it may yet commit."""
+
+
+class WriteBehindQueue:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW_MS / 1000,
+                 timeout=DEFAULT_TIMEOUT_MS / 1000):
+        self.batch_size = batch_size
+        self.window = window
+        self.timeout = timeout
+        self._pending = queue.SimpleQueue()
+        self._lock = threading.Lock()  # guards starting and closing
+        self._thread = None
+        self._closed = False
+        self.batches = 0  # committed batches and rows, for benchmarks
+        self.written = 0
+
+    def submit(self, txn):
+        """Queue an unsaved transaction; the Future resolves to it once committed."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise QueueClosed
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._pending.put((txn, future))
+        return future
+
+    def save(self, txn):
+        """Write ``txn`` through the queue and return it once committed."""
+        future = self.submit(txn)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise QueueTimeout from None
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise WriteTimeout from None
+
+    def close(self):
+        """Stop taking work, flush what is pending and wait for the flusher."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._pending.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                item = self._pending.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                # Requests that timed out meanwhile have withdrawn theirs.
+                batch = [(txn, future) for txn, future in batch if future.set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                try:
+                    # What a request does around its DB work: drop connections
+                    # that are broken or past CONN_MAX_AGE.
+                    close_old_connections()
+                    self._flush(batch)
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            connection.close()
+
+    def _flush(self, batch):
+        try:
+            _write([txn for txn, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            for txn, _ in batch:
+                txn.pk = None  # may have been set before the rollback
+                txn._state.adding = True
+            for item in batch:
+                self._flush([item])
+        else:
+            self.batches += 1
+            self.written += len(batch)
+            for txn, future in batch:
+                future.set_result(txn)
+
+
+def _write(transactions):
+    with transaction.atomic():
+        # bulk_create sends no signals; do what pre_save and post_save would have.
+        change_seqs = caching.bump_transactions_versions({txn.user_id for txn in transactions})
+        for txn in transactions:
+            txn.change_seq = change_seqs[txn.user_id]
+        TransactionDetails.objects.bulk_create(transactions)
+        rollups.record_many(transactions)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, 'TRANSACTION_WRITE_BEHIND', False)
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteBehindQueue(
+                batch_size=getattr(settings, 'TRANSACTION_WRITE_BEHIND_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+                window=getattr(settings, 'TRANSACTION_WRITE_BEHIND_WINDOW_MS', DEFAULT_WINDOW_MS) / 1000,
+                timeout=getattr(settings, 'TRANSACTION_WRITE_BEHIND_TIMEOUT_MS', DEFAULT_TIMEOUT_MS) / 1000,
+            )
+            atexit.register(_queue.close)
+        return _queue
+
+
+def reset_queue():
+    """Close the process's queue; the next ``get_queue()`` builds one from the current settings."""
+    global _queue
+    with _queue_lock:
+        current, _queue = _queue, None
+    if current is not None:
+        current.close()
@@ -3,14 +3,25 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server so the async views in ``api.async_views`` can
+overlap requests while passwords are hashed, e.g.::
+
+    uvicorn backend.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
+import sys
+from pathlib import Path
 
 from django.core.asgi import get_asgi_application
 
+# Same import paths as backend/manage.py: settings refer to top-level 'urls'.
+project_root = Path(__file__).resolve().parent
+sys.path.extend([str(project_root), str(project_root.parent)])
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
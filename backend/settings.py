@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',  # first, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -90,6 +91,41 @@ DATABASES = {
         'PASSWORD': 'Athulaynoor@1256',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Keep connections open between requests instead of reconnecting
+        # each time; health checks replace ones the server has dropped.
+        # Put PgBouncer in front when workers x aliases outgrow max_connections.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),  # seconds
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas as "host:port,host:port". Each becomes an alias replica_<n>
+# with the default credentials; see api/db_router.py for what reads from them.
+for index, address in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(','))):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+# How long reads of freshly written data stay on the primary; keep it above
+# the worst replication lag you expect
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache
+# Local memory is per process, so other workers only see invalidations once
+# entries time out (cached user pages, after USERS_PAGE_TIMEOUT); point this
+# at Redis or Memcached in production. Transaction ETag versions live in the
+# database and are never stale.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'exp-track'),
     }
 }
 
@@ -113,6 +149,12 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Bounded thread pool used by the async views for PBKDF2 (see api.hashing).
+# Defaults: one thread per CPU and up to four waiting hashes per thread.
+PASSWORD_HASH_POOL_SIZE = int(os.getenv('PASSWORD_HASH_POOL_SIZE', 0)) or None
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 0)) or None
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -151,8 +193,35 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # App users' tokens are accepted only by the views that opt in with
+    # @authentication_classes([UserDetailsTokenAuthentication]).
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    'EXCEPTION_HANDLER': 'api.exceptions.api_exception_handler',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
+
+# In-process token -> UserDetails cache used by UserDetailsTokenAuthentication
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 300))  # seconds
+
+# Expense categories kept per user and month in TopSpending
+TOP_SPENDING_K = int(os.getenv('TOP_SPENDING_K', 5))
+
+# How long create_transaction remembers an Idempotency-Key
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+# Batch create_transaction inserts through api/writebehind.py (0/1); helps
+# only when a process serves requests concurrently, e.g. gunicorn --threads
+TRANSACTION_WRITE_BEHIND = bool(int(os.getenv('TRANSACTION_WRITE_BEHIND', 0)))
+TRANSACTION_WRITE_BEHIND_BATCH_SIZE = int(os.getenv('TRANSACTION_WRITE_BEHIND_BATCH_SIZE', 100))
+TRANSACTION_WRITE_BEHIND_WINDOW_MS = int(os.getenv('TRANSACTION_WRITE_BEHIND_WINDOW_MS', 5))
+TRANSACTION_WRITE_BEHIND_TIMEOUT_MS = int(os.getenv('TRANSACTION_WRITE_BEHIND_TIMEOUT_MS', 2000))
+
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
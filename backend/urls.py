@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.http import HttpResponse
 from django.views.generic import RedirectView
 
+from api.metrics import metrics
+
 def welcome(request):
     return HttpResponse("""
         <h1>Welcome to the Django API</h1>
@@ -35,4 +37,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path('api-auth/', include('rest_framework.urls')),
+    path('metrics', metrics, name='metrics'),
 ]